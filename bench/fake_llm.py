@@ -0,0 +1,118 @@
+"""
+OpenAI-compatible stub of the chat completions API for benchmarks
+
+Judges every candidate answer by exact match (case-insensitive) with the reference answer,
+after a configurable latency, failing a configurable share of requests.
+
+    python -m bench.fake_llm --port 9100 --latency 0.8 --jitter 0.3 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import List, Tuple
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SINGLE_PATTERN = re.compile(
+    r"reference answer given by the user in the current round is: (?P<reference>.*?), \s*"
+    r"the answers given by the candidates are: \[(?P<answers>.*?)\]\.",
+    re.S
+)
+GROUP_PATTERN = re.compile(
+    r"Group \d+: the reference answer is: (?P<reference>.*?), "
+    r"the answers given by the candidates are: \[(?P<answers>.*?)\]\."
+)
+
+app = FastAPI()
+app.state.latency = 0.5
+app.state.jitter = 0.2
+app.state.error_rate = 0.0
+app.state.requests = 0
+
+def split_answers(answers: str) -> List[str]:
+    # format_guesses writes "a, b, " between the brackets
+    return [answer for answer in answers.split(", ") if answer]
+
+def judge(reference: str, answers: List[str]) -> List[dict]:
+    return [
+        {
+            "Judge": "true" if answer.strip().lower() == reference.strip().lower() else "false",
+            "Reason": "Matches the reference" if answer.strip().lower() == reference.strip().lower() else "Different from the reference"
+        }
+        for answer in answers
+    ]
+
+def answer_prompt(prompt: str) -> str:
+    groups: List[Tuple[str, str]] = [(m["reference"], m["answers"]) for m in GROUP_PATTERN.finditer(prompt)]
+    if groups:
+        return json.dumps([judge(reference, split_answers(answers)) for reference, answers in groups])
+    match = SINGLE_PATTERN.search(prompt)
+    if match is None:
+        return "[]"
+    return json.dumps(judge(match["reference"], split_answers(match["answers"])))
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    delay = max(0.0, random.gauss(app.state.latency, app.state.jitter))
+    await asyncio.sleep(delay)
+    if random.random() < app.state.error_rate:
+        return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+    content = answer_prompt(body["messages"][-1]["content"])
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def stream():
+        # Send the answer in a few pieces so streaming parsers see partial objects
+        size = max(len(content) // 4, 1)
+        for start in range(0, len(content), size):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Standard deviation of the latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.jitter = args.jitter
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Websocket load generator for DoodleGuess
+
+Starts the fake LLM and the server (unless --server-url is given), then plays full games with
+many concurrent rooms through the real protocol and reports throughput and latency per event.
+
+    python -m bench.loadgen --rooms 250 --players 4 --rounds 2 --save baseline
+    python -m bench.loadgen --rooms 250 --players 4 --rounds 2 --compare bench/baselines/baseline.json
+
+Several thousand clients need a raised open file limit (ulimit -n).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import httpx
+import websockets
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+sys.path.insert(0, str(ROOT_DIR))
+
+from server.strokes import rasterize_png  # noqa: E402
+
+KEYWORDS = ["cat", "house", "tree", "sun", "car", "fish", "apple", "boat"]
+
+class Recorder:
+    """
+    Collect latency samples and errors per event
+    """
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, event: str, seconds: float):
+        self.samples[event].append(seconds)
+
+    def error(self, event: str):
+        self.errors[event] += 1
+
+    def report(self, elapsed: float) -> dict:
+        results = {}
+        for event in sorted(set(self.samples) | set(self.errors)):
+            samples = sorted(self.samples.get(event, []))
+            results[event] = {
+                "count": len(samples),
+                "errors": self.errors.get(event, 0),
+                "throughput": len(samples) / elapsed if elapsed else 0,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "max_ms": (samples[-1] if samples else 0) * 1000
+            }
+        return results
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(int(round(p / 100 * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+class Client:
+    """
+    A simulated player: one websocket and the messages it received, waited on by event
+    """
+    def __init__(self, base_url: str, client_id: str):
+        self.ws_url = base_url.replace("http", "ws", 1) + f"/ws/{client_id}"
+        self.client_id = client_id
+        self.ws = None
+        self.reader: Optional[asyncio.Task] = None
+        self.inbox: List[dict] = []
+        self.arrived = asyncio.Event()
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.ws_url, max_size=None, open_timeout=30)
+        self.reader = asyncio.create_task(self.read())
+
+    async def read(self):
+        try:
+            async for message in self.ws:
+                self.inbox.append(json.loads(message))
+                self.arrived.set()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def send(self, message: dict):
+        await self.ws.send(json.dumps(message))
+
+    async def wait_for(self, events: tuple, predicate: Callable[[dict], bool] = lambda _: True, timeout: float = 60) -> dict:
+        """
+        Wait for the first message of one of the events, consuming it and everything received before it
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            for index, message in enumerate(self.inbox):
+                if message.get("event") in events and predicate(message):
+                    del self.inbox[:index + 1]
+                    return message
+            self.arrived.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Client {self.client_id} timed out waiting for {events}")
+            await asyncio.wait_for(self.arrived.wait(), remaining)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.reader is not None:
+            self.reader.cancel()
+
+async def timed(recorder: Recorder, event: str, operation):
+    started = time.perf_counter()
+    try:
+        result = await operation
+    except Exception:
+        recorder.error(event)
+        raise
+    recorder.record(event, time.perf_counter() - started)
+    return result
+
+async def play_room(index: int, args, http: httpx.AsyncClient, recorder: Recorder, drawing: bytes):
+    """
+    Play a full game in one room: create, join, then draw, guess, judge and ready for every round
+    """
+    run_id = uuid.uuid4().hex[:6]
+    clients = [Client(args.server_url, f"bench-{run_id}-{index}-{n}") for n in range(args.players)]
+    nicknames = {client.client_id: f"p{n}" for n, client in enumerate(clients)}
+    game_started = time.perf_counter()
+    try:
+        for client in clients:
+            await client.connect()
+        creator = clients[0]
+
+        await creator.send({
+            "event": "create_room",
+            "password": "bench",
+            "maxPlayers": args.players,
+            "rounds": args.rounds,
+            "creatorNickname": nicknames[creator.client_id]
+        })
+        created = await timed(recorder, "create_room", creator.wait_for(("room_created",)))
+        room_id = created["roomId"]
+
+        for client in clients[1:]:
+            await client.send({
+                "event": "join_room",
+                "roomId": room_id,
+                "password": "bench",
+                "nickname": nicknames[client.client_id]
+            })
+            await timed(recorder, "join_room", client.wait_for(("player_joined",)))
+
+        drawer = creator
+        for round_number in range(1, args.rounds + 1):
+            guessers = [client for client in clients if client is not drawer]
+            keyword = random.choice(KEYWORDS)
+
+            upload = await timed(recorder, "upload_drawing", http.post(
+                "/api/image/upload-drawing",
+                files={"file": ("blob", drawing, "image/png")},
+                data={"room_id": room_id, "player_id": drawer.client_id}
+            ))
+            upload.raise_for_status()
+
+            started = time.perf_counter()
+            await drawer.send({
+                "event": "submit_drawing",
+                "roomId": room_id,
+                "clientId": drawer.client_id,
+                "drawingUrl": upload.json()["url"],
+                "keyword": keyword
+            })
+            # Fan-out latency: until the last viewer has the drawing
+            await asyncio.gather(*(client.wait_for(("new_drawing",)) for client in guessers))
+            recorder.record("submit_drawing", time.perf_counter() - started)
+
+            for n, client in enumerate(guessers):
+                # Roughly half of the guesses are right
+                guess = keyword if n % 2 == 0 else random.choice(KEYWORDS)
+                response = await timed(recorder, "submit_guess", http.post("/api/game/submit-guess", json={
+                    "room_id": room_id,
+                    "player_id": client.client_id,
+                    "guess": guess
+                }))
+                response.raise_for_status()
+            all_guessed = await drawer.wait_for(("all_guessed",))
+
+            await drawer.send({
+                "event": "request_ai_judgment",
+                "roomId": room_id,
+                "keyword": keyword,
+                "guesses": all_guessed["guesses"]
+            })
+            verdict = await timed(recorder, "request_ai_judgment", drawer.wait_for(
+                ("ai_judgments", "ai_judgment_failed"), timeout=args.judge_timeout
+            ))
+            if verdict["event"] == "ai_judgment_failed":
+                recorder.error("ai_judgment_failed")
+                judgments = [{"player_id": g["player_id"], "is_correct": False} for g in verdict["guesses"]]
+            else:
+                judgments = [{"player_id": j["player_id"], "is_correct": j["is_correct"]} for j in verdict["judgments"]]
+
+            await drawer.send({"event": "submit_judgments", "roomId": room_id, "judgments": judgments})
+            result = await timed(recorder, "submit_judgments", drawer.wait_for(("round_end", "game_over")))
+            if result["event"] == "game_over":
+                break
+
+            # The next drawer starts the next round
+            next_drawer_id = next(player["client_id"] for player in result["players"] if player["isDrawing"])
+            drawer = next(client for client in clients if client.client_id == next_drawer_id)
+            await drawer.send({"event": "player_ready", "roomId": room_id, "clientId": drawer.client_id})
+            await timed(recorder, "player_ready", drawer.wait_for(
+                ("round_start",), lambda message: message.get("currentRound") == round_number + 1
+            ))
+        recorder.record("game", time.perf_counter() - game_started)
+    except Exception as e:
+        recorder.error("game")
+        if args.verbose:
+            print(f"Room {index} failed: {type(e).__name__}: {e}", file=sys.stderr)
+    finally:
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+def sample_drawing() -> bytes:
+    points = []
+    x = y = 350
+    for _ in range(400):
+        x = min(max(x + random.randint(-12, 12), 0), 699)
+        y = min(max(y + random.randint(-12, 12), 0), 699)
+        points += [x, y]
+    return rasterize_png([{"i": 1, "c": "#000000", "w": 3, "p": points}])
+
+async def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout}s")
+            await asyncio.sleep(0.2)
+
+def start_processes(args) -> List[subprocess.Popen]:
+    """
+    Start the fake LLM and the server with a throwaway judgment cache and room store
+    """
+    workdir = tempfile.mkdtemp(prefix="doodle-bench-")
+    env = {
+        **os.environ,
+        "AI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "AI_KEY": "bench",
+        "AI_MODEL": "fake",
+        "JUDGE_CACHE_PATH": str(Path(workdir) / "judgments.json"),
+        "ROOM_STORE_PATH": str(Path(workdir) / "rooms.db"),
+    }
+    if args.no_cache:
+        env["JUDGE_CACHE_SIZE"] = "0"
+    llm = subprocess.Popen([
+        sys.executable, "-m", "bench.fake_llm", "--port", str(args.llm_port),
+        "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter), "--error-rate", str(args.llm_error_rate)
+    ], cwd=str(ROOT_DIR), env=env)
+    server = subprocess.Popen([
+        sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers), "--no-reload",
+        *(["--supervisor"] if args.supervisor else [])
+    ], cwd=str(ROOT_DIR), env=env, stdout=subprocess.DEVNULL if not args.verbose else None, stderr=subprocess.DEVNULL if not args.verbose else None)
+    return [llm, server]
+
+async def run(args) -> dict:
+    processes = []
+    if args.server_url is None:
+        args.server_url = f"http://127.0.0.1:{args.port}"
+        processes = start_processes(args)
+    try:
+        await wait_until_up(f"{args.server_url}/")
+        recorder = Recorder()
+        drawing = sample_drawing()
+        limits = httpx.Limits(max_connections=args.http_connections, max_keepalive_connections=args.http_connections)
+        async with httpx.AsyncClient(base_url=args.server_url, limits=limits, timeout=60) as http:
+            started = time.perf_counter()
+
+            async def delayed(index: int):
+                # Spread room starts over the ramp-up period
+                await asyncio.sleep(args.ramp * index / max(args.rooms, 1))
+                await play_room(index, args, http, recorder, drawing)
+
+            await asyncio.gather(*(delayed(index) for index in range(args.rooms)))
+            elapsed = time.perf_counter() - started
+        return {
+            "config": {
+                "rooms": args.rooms,
+                "players": args.players,
+                "rounds": args.rounds,
+                "workers": args.workers,
+                "supervisor": args.supervisor,
+                "llm_latency": args.llm_latency,
+                "llm_error_rate": args.llm_error_rate
+            },
+            "elapsed_s": elapsed,
+            "events": recorder.report(elapsed)
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def print_report(result: dict):
+    print(f"\n{result['config']['rooms']} rooms x {result['config']['players']} players in {result['elapsed_s']:.1f}s")
+    print(f"{'event':<22}{'count':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for event, stats in result["events"].items():
+        print(
+            f"{event:<22}{stats['count']:>8}{stats['errors']:>8}{stats['throughput']:>10.1f}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+        )
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Events whose p95 latency or error count regressed beyond the tolerance
+    """
+    regressions = []
+    for event, stats in baseline["events"].items():
+        current = result["events"].get(event)
+        if current is None:
+            continue
+        # Ignore sub-millisecond noise
+        if current["p95_ms"] > stats["p95_ms"] * (1 + tolerance) and current["p95_ms"] - stats["p95_ms"] > 1:
+            regressions.append(f"{event}: p95 {stats['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+        if current["errors"] > stats["errors"] * (1 + tolerance) + 1:
+            regressions.append(f"{event}: errors {stats['errors']} -> {current['errors']}")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DoodleGuess load generator")
+    parser.add_argument("--server-url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the server started for the benchmark")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--supervisor", action="store_true", help="Start the server with the sharding supervisor")
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--players", type=int, default=4, help="Players per room, including the drawer")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which rooms are started")
+    parser.add_argument("--http-connections", type=int, default=200)
+    parser.add_argument("--judge-timeout", type=float, default=60)
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the verdict cache of the started server")
+    parser.add_argument("--save", metavar="NAME", help="Save the results as bench/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 regression")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.save:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f"{args.save}.json"
+        path.write_text(json.dumps(result, indent=2))
+        print(f"\nSaved baseline to {path}")
+
+    if args.compare:
+        regressions = compare(result, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
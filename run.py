@@ -1,6 +1,8 @@
 import uvicorn
 import os
 import argparse
+import subprocess
+import threading
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -15,6 +17,7 @@ sys.path.insert(0, str(PROJECT_ROOT))
 DEFAULT_HOST = os.getenv("HOST", "0.0.0.0")
 DEFAULT_PORT = int(os.getenv("PORT", "8000"))
 DEFAULT_WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_HOST = os.getenv("WORKER_HOST", "127.0.0.1")
 # DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
 def parse_args():
@@ -51,8 +54,61 @@ def parse_args():
         help="Enable auto-reload on code changes (development mode)"
     )
     
+    parser.add_argument(
+        "--no-reload",
+        dest="reload",
+        action="store_false",
+        help="Disable auto-reload"
+    )
+    
+    parser.add_argument(
+        "--supervisor",
+        action="store_true",
+        help="Run each worker as its own shard behind a proxy that routes every room to the same worker"
+    )
+    
     return parser.parse_args()
 
+def run_supervisor(args):
+    """
+    Start one worker process per shard on private ports and serve the routing proxy on the public port
+    Workers that exit are restarted; rooms keep living in the memory of their home worker.
+    """
+    base_port = int(os.getenv("WORKER_BASE_PORT", str(args.port + 100)))
+    os.environ["SHARD_COUNT"] = str(args.workers)
+    os.environ["WORKER_BASE_PORT"] = str(base_port)
+    os.environ["WORKER_HOST"] = WORKER_HOST
+
+    def spawn(shard: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server.main:app", "--host", WORKER_HOST, "--port", str(base_port + shard)],
+            cwd=str(PROJECT_ROOT),
+            env={**os.environ, "SHARD_INDEX": str(shard)}
+        )
+
+    workers = [spawn(shard) for shard in range(args.workers)]
+    stopping = threading.Event()
+
+    def watch():
+        while not stopping.wait(1):
+            for shard, process in enumerate(workers):
+                if process.poll() is not None:
+                    print(f"Worker {shard} exited with code {process.returncode}, restarting")
+                    workers[shard] = spawn(shard)
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        uvicorn.run("server.proxy:app", host=args.host, port=args.port)
+    finally:
+        stopping.set()
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
 def main():
     """
     Main entry point for the server
@@ -71,6 +127,17 @@ def main():
     #     print(f"  Reload: {args.reload}")
     #     print(f"  Debug: {DEBUG}")
     
+    if args.supervisor:
+        run_supervisor(args)
+        return
+
+    if args.workers > 1:
+        # Auto-reload runs a single process, and workers only see each other's rooms through a shared store
+        args.reload = False
+        if os.getenv("ROOM_STORE", "memory") == "memory":
+            os.environ["ROOM_STORE"] = "sqlite"
+            print("Multiple workers: using the shared SQLite room store (set ROOM_STORE to override)")
+
     # Start the server
     uvicorn.run(
         "server.main:app",
@@ -7,11 +7,15 @@ Description: It's the AI handler for the project.
 import logging
 import json
 import time
-from typing import List
+import random
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 import asyncio
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 import os
 from dotenv import load_dotenv
+from server import metrics
 
 # Load environment variables
 load_dotenv()
@@ -50,35 +54,480 @@ In the DoodleGuess game, the user provides a reference answer, and the guesser a
 2. Your answer is structured that must follow the <OutputFormat>, do not include any other information.
 3. your reason response must match the language of the reference answer."""
 
-def completion(
+# Connection pool limits for the shared AI client
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))
+AI_MAX_KEEPALIVE = int(os.getenv("AI_MAX_KEEPALIVE", "10"))
+
+# One long-lived client per (base_url, key), shared by every room in the process
+_clients: Dict[Tuple[Optional[str], Optional[str]], AsyncOpenAI] = {}
+
+def get_client(base_url: Optional[str] = None, key: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Get the shared async AI client, creating it on first use
+    Args:
+        base_url (str): The base URL of the AI provider
+        key (str): The API key of the AI provider
+    Returns:
+        AsyncOpenAI: A client that reuses its HTTP connection pool across calls
+    """
+    client = _clients.get((base_url, key))
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=key,
+            base_url=base_url,
+            # Retries and timeouts are handled by request_judgments
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=AI_MAX_CONNECTIONS,
+                    max_keepalive_connections=AI_MAX_KEEPALIVE
+                )
+            )
+        )
+        _clients[(base_url, key)] = client
+        logger.info(f"Created shared AI client for {base_url}")
+    return client
+
+async def close_clients():
+    """
+    Close all shared AI clients and their connection pools
+    """
+    while _clients:
+        _, client = _clients.popitem()
+        await client.close()
+
+async def completion(
     message: str,
     model: str = os.getenv('AI_MODEL'),
     base_url: str = os.getenv('AI_BASE_URL'),
-    key: str = os.getenv('AI_KEY')
+    key: str = os.getenv('AI_KEY'),
+    on_delta: Optional[Callable[[str], None]] = None
 ) -> str:
 
-    client = OpenAI(
-        api_key=key,
-        base_url=base_url
-    )
+    client = get_client(base_url, key)
 
-    response = client.chat.completions.create(
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": message}
+    ]
+
+    if on_delta is None:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages
+        )
+        return response.choices[0].message.content
+
+    # Stream the response, passing each piece of text on as it arrives
+    stream = await client.chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": message}
-        ]
+        messages=messages,
+        stream=True
     )
+    content = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            content.append(delta)
+            on_delta(delta)
+    return "".join(content)
+
+class VerdictStream:
+    """
+    Incrementally pick complete judgment objects out of streamed AI output
+    The callback receives the object's position in the (possibly nested) arrays and the object itself.
+    """
+    def __init__(self, on_object: Callable[[Tuple[int, ...], dict], None]):
+        self.on_object = on_object
+        self.path: List[int] = []  # Index of the current item in each open array
+        self.depth = 0  # Nesting depth of objects
+        self.quote: Optional[str] = None
+        self.escaped = False
+        self.buffer: List[str] = []
+
+    def feed(self, text: str):
+        for ch in text:
+            if self.depth:
+                self.buffer.append(ch)
+            if self.quote:
+                # Apostrophes inside double-quoted strings do not end them
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == self.quote:
+                    self.quote = None
+                continue
+            if ch in "\"'" and self.depth:
+                self.quote = ch
+            elif ch == "{":
+                if not self.depth:
+                    self.buffer = [ch]
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    self.emit("".join(self.buffer))
+            elif self.depth:
+                continue
+            elif ch == "[":
+                self.path.append(0)
+            elif ch == "]" and self.path:
+                self.path.pop()
+                if self.path:
+                    self.path[-1] += 1
+
+    def emit(self, text: str):
+        position = tuple(self.path)
+        if self.path:
+            self.path[-1] += 1
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                obj = json.loads(text.replace("'", '"').replace('\\', ''))
+            except json.JSONDecodeError:
+                return
+        if isinstance(obj, dict):
+            self.on_object(position, obj)
+
+def parse_response(response: str) -> list:
+    """
+    Clean the raw AI response and parse it as a JSON array
+    Args:
+        response (str): The raw response text returned by the AI
+    Returns:
+        list: The parsed JSON array
+    Raises:
+        ValueError: If the response is empty or not a valid JSON array
+    """
+    if not response:
+        raise ValueError("Empty response from AI")
+
+    # Clean and normalize the response
+    response = response.strip()
+    response = response.replace("'", '"')
+    response = response.replace('\\n', '')
+    response = response.replace('\\', '')
+    
+    if not response.startswith('[') or not response.endswith(']'):
+        raise ValueError(f"Response is not a valid JSON array: {response}")
+    
+    logger.info(f"Normalized response: {response}")
     
-    return response.choices[0].message.content
+    # Parse JSON response
+    try:
+        judgments = json.loads(response)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON response from AI: {str(e)}\nResponse: {response}")
+    
+    # Validate response structure
+    if not isinstance(judgments, list):
+        raise ValueError(f"Response is not a list. Got: {type(judgments)}")
+    return judgments
 
-async def judge_guesses(user_answer: str, guesser_answer: List[str], max_retries: int = 3) -> List[dict]:
+def normalize_judgments(judgments: list, guesser_answer: List[str]) -> List[dict]:
+    """
+    Validate the AI judgments and convert them to the format used by the game
+    Args:
+        judgments (list): The parsed judgments for one reference answer
+        guesser_answer (List[str]): The answers given by the candidates
+    Returns:
+        List[dict]: List of dictionaries containing judgment and reason for each answer
+    Raises:
+        ValueError: If the judgments do not match the answers
+    """
+    if not isinstance(judgments, list):
+        raise ValueError(f"Judgments are not a list. Got: {type(judgments)}")
+
+    if len(judgments) != len(guesser_answer):
+        raise ValueError(f"The number of judgments ({len(judgments)}) does not match the number of answers ({len(guesser_answer)})")
+    
+    normalized_judgments = []
+    for i, (judgment, guess) in enumerate(zip(judgments, guesser_answer)):
+        if not isinstance(judgment, dict):
+            raise ValueError(f"Judgment {i} is not an object. Got: {type(judgment)}")
+        
+        if "Judge" not in judgment:
+            raise ValueError(f"Judgment {i} missing 'Judge' field")
+        if "Reason" not in judgment:
+            raise ValueError(f"Judgment {i} missing 'Reason' field")
+        
+        normalized_judgment = {
+            "is_correct": str(judgment["Judge"]).lower() == "true",
+            "reason": judgment["Reason"],
+            "guess": guess
+        }
+        normalized_judgments.append(normalized_judgment)
+    return normalized_judgments
+
+# Deadline, timeout and hedging configuration
+AI_JUDGE_DEADLINE = float(os.getenv("AI_JUDGE_DEADLINE", "30"))  # Seconds per round
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "15"))  # Used until enough latencies are observed
+AI_MIN_TIMEOUT = float(os.getenv("AI_MIN_TIMEOUT", "2"))
+AI_HEDGE = os.getenv("AI_HEDGE", "true").lower() == "true"
+AI_STREAM = os.getenv("AI_STREAM", "true").lower() == "true"
+AI_BREAKER_THRESHOLD = int(os.getenv("AI_BREAKER_THRESHOLD", "5"))
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "30"))
+
+class CircuitOpenError(Exception):
+    pass
+
+class LatencyTracker:
+    """
+    Keep a sliding window of recent AI latencies and derive timeouts from it
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def timeout(self) -> float:
+        """
+        Adaptive per-attempt timeout: a margin over p99, bounded by the configured limits
+        """
+        p99 = self.percentile(99)
+        if p99 is None:
+            return AI_TIMEOUT
+        return max(AI_MIN_TIMEOUT, min(AI_TIMEOUT, p99 * 2))
+
+class CircuitBreaker:
+    """
+    Stop calling the AI provider after repeated failures, probing again after a cooldown
+    """
+    def __init__(self, threshold: int = AI_BREAKER_THRESHOLD, cooldown: float = AI_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        # Let a single probe request through once the cooldown has passed
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("AI circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"AI circuit breaker opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+latency_tracker = LatencyTracker()
+circuit_breaker = CircuitBreaker()
+
+def new_deadline(budget: float = AI_JUDGE_DEADLINE) -> float:
+    """
+    Get the event loop time by which a round's judgment must be finished
+    """
+    return asyncio.get_running_loop().time() + budget
+
+async def hedged_completion(prompt: str, timeout: float, on_object: Optional[Callable[[Tuple[int, ...], dict], None]] = None) -> str:
+    """
+    Call the AI, sending a second identical request if the first is slower than p95
+    Args:
+        prompt (str): The user prompt to send
+        timeout (float): Seconds to wait for any of the requests
+        on_object (Callable): If given, the response is streamed and each judgment object is passed on as it completes
+    Returns:
+        str: The first successful response
+    Raises:
+        asyncio.TimeoutError: If no request finishes within the timeout
+    """
+    def start() -> asyncio.Task:
+        if on_object is None:
+            return asyncio.create_task(completion(prompt))
+        # Every request parses its own stream
+        return asyncio.create_task(completion(prompt, on_delta=VerdictStream(on_object).feed))
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = [start()]
+    try:
+        hedge_after = latency_tracker.percentile(95) if AI_HEDGE else None
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                logger.info(f"AI request slower than p95 ({hedge_after:.2f}s), sending hedged request")
+                tasks.append(start())
+
+        last_error = None
+        while tasks:
+            remaining = timeout - (loop.time() - started)
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    latency_tracker.record(loop.time() - started)
+                    return task.result()
+                last_error = task.exception()
+        if last_error is not None and not tasks:
+            raise last_error
+        raise asyncio.TimeoutError(f"AI request timed out after {timeout:.2f}s")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def request_judgments(
+    prompt: str,
+    parse: Callable[[list], Any],
+    max_retries: int = 3,
+    deadline: Optional[float] = None,
+    on_object: Optional[Callable[[Tuple[int, ...], dict], None]] = None
+) -> Any:
+    """
+    Send a judgment prompt to the AI, retrying until the response can be parsed
+    Args:
+        prompt (str): The user prompt to send
+        parse (Callable): Converts the parsed JSON array into the final result
+        max_retries (int): Maximum number of retries if parsing fails
+        deadline (float): Event loop time by which the judgment must be finished
+        on_object (Callable): Receives each judgment object as it is streamed
+    Returns:
+        Any: The value returned by parse
+    Raises:
+        CircuitOpenError: If the AI provider is currently considered unhealthy
+        Exception: If AI judgment fails after all retries or the deadline passes
+    """
+    loop = asyncio.get_running_loop()
+    if deadline is None:
+        deadline = new_deadline()
+
+    started = loop.time()
+    last_error = None
+    for attempt in range(max_retries):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            last_error = last_error or asyncio.TimeoutError("Deadline exceeded")
+            break
+        if not circuit_breaker.allow():
+            metrics.ai_judge_requests.inc("circuit_open")
+            raise CircuitOpenError("AI provider is unavailable, please judge manually")
+
+        try:
+            # Get AI response
+            try:
+                response = await hedged_completion(prompt, min(remaining, latency_tracker.timeout()), on_object)
+            except Exception:
+                circuit_breaker.record_failure()
+                raise
+            circuit_breaker.record_success()
+            logger.info(f"Raw AI response: {response}")
+            result = parse(parse_response(response))
+            logger.info(f"Normalized judgments: {result}")
+            metrics.ai_judge_requests.inc("success")
+            metrics.ai_judge_duration.observe(loop.time() - started, "success")
+            return result
+            
+        except Exception as e:
+            last_error = e
+            logger.error(f"AI judgment attempt {attempt + 1} failed: {type(e).__name__}: {str(e)}")
+            if attempt < max_retries - 1:
+                metrics.ai_judge_retries.inc()
+                # Exponential backoff with jitter, never sleeping past the deadline
+                backoff = min(0.5 * 2 ** attempt, 4) * random.uniform(0.5, 1)
+                await asyncio.sleep(max(0, min(backoff, deadline - loop.time())))
+                continue
+    
+    # If we get here, all retries failed
+    metrics.ai_judge_requests.inc("failure")
+    metrics.ai_judge_duration.observe(loop.time() - started, "failure")
+    raise Exception(f"AI judgment failed after {attempt + 1} attempts. Last error: {str(last_error)}")
+
+def verdict_listener(
+    requests: List[List[str]],
+    on_verdict: Callable[[int, int, dict], None],
+    nested: bool
+) -> Optional[Callable[[Tuple[int, ...], dict], None]]:
+    """
+    Turn streamed judgment objects into normalized verdicts, each reported once
+    Args:
+        requests (List[List[str]]): The candidate answers of each group
+        on_verdict (Callable): Called with (group index, answer index, verdict)
+        nested (bool): Whether the response is an array of groups rather than a single group
+    Returns:
+        Callable: The callback for VerdictStream, or None if streaming is disabled
+    """
+    if not AI_STREAM:
+        return None
+    emitted: Set[Tuple[int, int]] = set()
+
+    def on_object(position: Tuple[int, ...], judgment: dict):
+        if len(position) != (2 if nested else 1):
+            return
+        group, index = position if nested else (0, position[0])
+        if group >= len(requests) or index >= len(requests[group]) or (group, index) in emitted:
+            return
+        try:
+            verdict = normalize_judgments([judgment], [requests[group][index]])[0]
+        except ValueError:
+            return
+        emitted.add((group, index))
+        try:
+            on_verdict(group, index, verdict)
+        except Exception as e:
+            logger.error(f"Error handling streamed verdict: {str(e)}")
+
+    return on_object
+
+def format_guesses(guesser_answer: List[str]) -> str:
+    guess_str = "["
+    for guess in guesser_answer:
+        guess_str += f"{guess}, "
+    guess_str += "]"
+    return guess_str
+
+async def judge_guesses(
+    user_answer: str,
+    guesser_answer: List[str],
+    max_retries: int = 3,
+    deadline: Optional[float] = None,
+    on_verdict: Optional[Callable[[int, dict], None]] = None
+) -> List[dict]:
     """
     Judge the answer and convert AI's response to a list of dictionaries with judgments and reasons
     Args:
         user_answer (str): The reference answer given by the user in the current round
         guesser_answer (List[str]): The answers given by the candidates
         max_retries (int): Maximum number of retries if parsing fails
+        deadline (float): Event loop time by which the judgment must be finished
+        on_verdict (Callable): Called with (answer index, verdict) as each verdict is streamed
     Returns:
         List[dict]: List of dictionaries containing judgment and reason for each answer
     Raises:
@@ -87,14 +536,9 @@ async def judge_guesses(user_answer: str, guesser_answer: List[str], max_retries
     if not guesser_answer:
         raise ValueError("No guesses to judge")
 
-    guess_str = "["
-    for guess in guesser_answer:
-        guess_str += f"{guess}, "
-    guess_str += "]"
-
     prompt = f"""
     The reference answer given by the user in the current round is: {user_answer}, 
-    the answers given by the candidates are: {guess_str}. 
+    the answers given by the candidates are: {format_guesses(guesser_answer)}. 
     Remember your system prompt and the notes. 
     <Notes>
     1. For different reference answers, their is no memory between them.
@@ -103,65 +547,157 @@ async def judge_guesses(user_answer: str, guesser_answer: List[str], max_retries
     4. The number of judgments in dictionary must be equal to the number of input answers.
     """
 
-    last_error = None
-    for attempt in range(max_retries):
-        try:
-            # Get AI response
-            response = completion(prompt)
-            logger.info(f"Raw AI response: {response}")
-            if not response:
-                raise ValueError(f"Empty response from AI (attempt {attempt + 1}/{max_retries})")
-            
-            # Clean and normalize the response
-            response = response.strip()
-            response = response.replace("'", '"')
-            response = response.replace('\\n', '')
-            response = response.replace('\\', '')
-            
-            if not response.startswith('[') or not response.endswith(']'):
-                raise ValueError(f"Response is not a valid JSON array: {response}")
-            
-            logger.info(f"Normalized response: {response}")
-            
-            # Parse JSON response
+    return await request_judgments(
+        prompt,
+        lambda judgments: normalize_judgments(judgments, guesser_answer),
+        max_retries,
+        deadline,
+        verdict_listener([guesser_answer], lambda _, index, verdict: on_verdict(index, verdict), nested=False) if on_verdict else None
+    )
+
+async def judge_guesses_batch(
+    requests: List[Tuple[str, List[str]]],
+    max_retries: int = 3,
+    deadline: Optional[float] = None,
+    on_verdict: Optional[Callable[[int, int, dict], None]] = None
+) -> List[List[dict]]:
+    """
+    Judge several rounds with a single AI call
+    Args:
+        requests (List[Tuple[str, List[str]]]): (reference answer, candidate answers) for each round
+        max_retries (int): Maximum number of retries if parsing fails
+        deadline (float): Event loop time by which the judgment must be finished
+        on_verdict (Callable): Called with (request index, answer index, verdict) as each verdict is streamed
+    Returns:
+        List[List[dict]]: The judgments of each round, in the same order as requests
+    Raises:
+        Exception: If AI judgment fails after all retries
+    """
+    if not requests or any(not guesses for _, guesses in requests):
+        raise ValueError("No guesses to judge")
+
+    groups = "\n".join(
+        f"    Group {i + 1}: the reference answer is: {user_answer}, the answers given by the candidates are: {format_guesses(guesses)}."
+        for i, (user_answer, guesses) in enumerate(requests)
+    )
+    prompt = f"""
+    There are {len(requests)} independent groups to judge in this request.
+{groups}
+    Remember your system prompt and the notes. 
+    <Notes>
+    1. Each group has its own reference answer, their is no memory between groups.
+    2. Your answer must be a JSON array containing one array per group, in the same order as the groups, and each inner array must follow the <OutputFormat>. Do not include any other information.
+    3. The reason of each group must match the language of that group's reference answer.
+    4. The number of inner arrays must be equal to the number of groups, and the number of judgments in each inner array must be equal to the number of answers in that group.
+    """
+
+    def parse(judgments: list) -> List[List[dict]]:
+        if len(judgments) != len(requests):
+            raise ValueError(f"The number of groups ({len(judgments)}) does not match the number of requests ({len(requests)})")
+        return [
+            normalize_judgments(group, guesses)
+            for group, (_, guesses) in zip(judgments, requests)
+        ]
+
+    return await request_judgments(
+        prompt,
+        parse,
+        max_retries,
+        deadline,
+        verdict_listener([guesses for _, guesses in requests], on_verdict, nested=True) if on_verdict else None
+    )
+
+# Micro-batching configuration
+AI_BATCH_WINDOW = float(os.getenv("AI_BATCH_WINDOW", "0.05"))  # Seconds, 0 disables batching
+AI_BATCH_MAX_REQUESTS = int(os.getenv("AI_BATCH_MAX_REQUESTS", "8"))
+
+class JudgeBatcher:
+    """
+    Collect concurrent judgment requests from different rooms and send them to the AI as one prompt
+    """
+    def __init__(self, window: float = AI_BATCH_WINDOW, max_requests: int = AI_BATCH_MAX_REQUESTS):
+        self.window = window
+        self.max_requests = max_requests
+        # (reference answer, candidate answers, deadline, verdict callback, result future)
+        self.pending: List[Tuple[str, List[str], float, Optional[Callable[[int, dict], None]], asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def judge(
+        self,
+        user_answer: str,
+        guesser_answer: List[str],
+        deadline: Optional[float] = None,
+        on_verdict: Optional[Callable[[int, dict], None]] = None
+    ) -> List[dict]:
+        """
+        Queue a judgment request and wait for its share of the batched result
+        """
+        # Send rooms straight to manual judgment while the provider is unhealthy
+        if circuit_breaker.state == "open":
+            raise CircuitOpenError("AI provider is unavailable, please judge manually")
+        if deadline is None:
+            deadline = new_deadline()
+        if self.window <= 0 or self.max_requests <= 1:
+            return await judge_guesses(user_answer, guesser_answer, deadline=deadline, on_verdict=on_verdict)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((user_answer, guesser_answer, deadline, on_verdict, future))
+        if len(self.pending) >= self.max_requests:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self.run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch: List[Tuple[str, List[str], float, Optional[Callable[[int, dict], None]], asyncio.Future]]):
+        if len(batch) > 1:
+            def on_verdict(group: int, index: int, verdict: dict):
+                callback = batch[group][3]
+                if callback:
+                    callback(index, verdict)
+
             try:
-                judgments = json.loads(response)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON response from AI: {str(e)}\nResponse: {response}")
-            
-            # Validate response structure
-            if not isinstance(judgments, list):
-                raise ValueError(f"Response is not a list. Got: {type(judgments)}")
-            
-            if len(judgments) != len(guesser_answer):
-                raise ValueError(f"The number of judgments ({len(judgments)}) does not match the number of answers ({len(guesser_answer)})")
-            
-            normalized_judgments = []
-            for i, (judgment, guess) in enumerate(zip(judgments, guesser_answer)):
-                if not isinstance(judgment, dict):
-                    raise ValueError(f"Judgment {i} is not an object. Got: {type(judgment)}")
-                
-                if "Judge" not in judgment:
-                    raise ValueError(f"Judgment {i} missing 'Judge' field")
-                if "Reason" not in judgment:
-                    raise ValueError(f"Judgment {i} missing 'Reason' field")
-                
-                normalized_judgment = {
-                    "is_correct": str(judgment["Judge"]).lower() == "true",
-                    "reason": judgment["Reason"],
-                    "guess": guess
-                }
-                normalized_judgments.append(normalized_judgment)
-            
-            logger.info(f"Normalized judgments: {normalized_judgments}")
-            return normalized_judgments
-            
-        except Exception as e:
-            last_error = e
-            logger.error(f"AI judgment attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(1)
-                continue
-    
-    # If we get here, all retries failed
-    raise Exception(f"AI judgment failed after {max_retries} attempts. Last error: {str(last_error)}")
+                # A single attempt within the tightest deadline: on failure every request still gets its own retries below
+                results = await judge_guesses_batch(
+                    [(answer, guesses) for answer, guesses, _, _, _ in batch],
+                    max_retries=1,
+                    deadline=min(deadline for _, _, deadline, _, _ in batch),
+                    on_verdict=on_verdict if any(callback for _, _, _, callback, _ in batch) else None
+                )
+                logger.info(f"Judged {len(batch)} requests in one AI call")
+                for (_, _, _, _, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+                return
+            except CircuitOpenError as e:
+                for _, _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            except Exception as e:
+                logger.error(f"Batched AI judgment failed, judging {len(batch)} requests separately: {str(e)}")
+
+        # Single request, or the batch failed: judge each request on its own
+        async def judge_one(answer: str, guesses: List[str], deadline: float, on_verdict: Optional[Callable[[int, dict], None]], future: asyncio.Future):
+            try:
+                result = await judge_guesses(answer, guesses, deadline=deadline, on_verdict=on_verdict)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+        await asyncio.gather(*(judge_one(*request) for request in batch))
+
+judge_batcher = JudgeBatcher()
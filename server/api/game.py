@@ -25,6 +25,7 @@ class GameState(BaseModel):
     players: List[dict]
     status: str
     keyword: Optional[str]
+    version: int = 0
 
 @router.post("/submit-guess")
 async def submit_guess(submission: GuessSubmission):
@@ -33,25 +34,22 @@ async def submit_guess(submission: GuessSubmission):
         logger.warning(f"Room {submission.room_id} not found")
         raise HTTPException(status_code=404, detail="Room not found")
     
-    room = rooms[submission.room_id]
-    
-    # Record the player's guess
-    if "guesses" not in room:
-        room["guesses"] = {}
-    room["guesses"][submission.player_id] = submission.guess
-    
-    # Check if all players have submitted guesses
-    non_drawing_players = [p for p in room["players"] if not p["isDrawing"]]
-    all_guessed = all(p["client_id"] in room["guesses"] for p in non_drawing_players)
-    
-    if all_guessed:
-        # Notify all players in the room
-        await manager.broadcast_to_room(submission.room_id, {
-            "event": "all_guessed",
-            "guesses": room["guesses"]
-        })
-        logger.info(f"All players have submitted guesses in room {submission.room_id}")
-        return {"status": "success", "all_guessed": True}
+    async with rooms.lock(submission.room_id):
+        room = rooms.get(submission.room_id)
+        if room is None:
+            raise HTTPException(status_code=404, detail="Room not found")
+        
+        # Record the player's guess and check if all players have submitted guesses
+        all_guessed = room.record_guess(submission.player_id, submission.guess)
+        
+        if all_guessed:
+            # Notify all players in the room
+            await manager.broadcast_to_room(submission.room_id, {
+                "event": "all_guessed",
+                "guesses": room.guesses
+            })
+            logger.info(f"All players have submitted guesses in room {submission.room_id}")
+            return {"status": "success", "all_guessed": True}
     
     return {"status": "success", "all_guessed": False}
 
@@ -63,15 +61,16 @@ async def get_game_state(room_id: str) -> GameState:
         raise HTTPException(status_code=404, detail="Room not found")
     
     room = rooms[room_id]
-    current_player = next((p["nickname"] for p in room["players"] if p["isDrawing"]), None)
-    keyword = room.get("currentKeyword") if current_player else None
+    current_player = room.drawer.nickname if room.drawer else None
+    keyword = room.current_keyword if current_player else None
     
     return GameState(
         room_id=room_id,
-        current_round=room["currentRound"],
-        total_rounds=room["totalRounds"],
+        current_round=room.current_round,
+        total_rounds=room.total_rounds,
         current_player=current_player,
-        players=room["players"],
-        status=room["status"],
-        keyword=keyword
+        players=room.players_payload(),
+        status=room.status,
+        keyword=keyword,
+        version=room.version
     ) 
\ No newline at end of file
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from typing import Optional
-import aiofiles
+import hashlib
+import logging
 import os
-from datetime import datetime
 from pathlib import Path
+from ..drawings import Drawing, drawing_etag, drawing_store, drawing_url
+from ..strokes import rasterize_png, stroke_store
+from ..transcode import png_width, transcoder
+from .. import metrics
+from ..websocket import rooms
+
+# Set up logging
+logger = logging.getLogger(__name__)
 
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -16,6 +25,29 @@ router = APIRouter(
 UPLOAD_DIR = ROOT_DIR / "public" / "images"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Upload limits
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# Drawing URLs are content-addressed, so their bytes never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Accepted image formats, recognised by their leading bytes rather than the client filename
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
 # Mount the static files directory
 router.mount("/static", StaticFiles(directory=str(UPLOAD_DIR)), name="static")
 
@@ -25,33 +57,101 @@ async def upload_drawing(
     room_id: str = Form(...),
     player_id: str = Form(...)
 ):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{room_id}_{player_id}_{timestamp}{os.path.splitext(file.filename)[1]}"
-    file_path = UPLOAD_DIR / filename
-    
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        content = await file.read()
-        await out_file.write(content)
-    
+    """
+    Stream an uploaded drawing in chunks, up to UPLOAD_MAX_BYTES, and make it the room's current drawing
+    The stored name is derived from the content hash, so re-uploading the same drawing reuses the stored copy.
+    """
+    if any(sep in room_id + player_id for sep in ("/", "\\", "..")):
+        raise HTTPException(status_code=400, detail="Invalid room or player ID")
+    digest = hashlib.sha256()
+    size = 0
+    extension = None
+    chunks = []
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if extension is None:
+            extension = sniff_extension(chunk)
+            if extension is None:
+                raise HTTPException(status_code=415, detail="Unsupported image format")
+        size += len(chunk)
+        if size > UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Drawing exceeds {UPLOAD_MAX_BYTES} bytes")
+        digest.update(chunk)
+        chunks.append(chunk)
+    if extension is None:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    filename = f"{room_id}_{player_id}_{digest.hexdigest()[:32]}{extension}"
+    data = b"".join(chunks)
+    metrics.upload_bytes.observe(size)
+    deduplicated = await drawing_store.add(Drawing(room_id, filename, data, png_width(data)))
+    # Produce the WebP, thumbnail and optimized variants in the background
+    current = drawing_store.get(room_id)
+    if current is not None:
+        transcoder.submit(current)
+
+    logger.info(f"Stored drawing {filename} ({size} bytes{', deduplicated' if deduplicated else ''})")
     return {
         "status": "success",
         "filename": filename,
-        "url": f"/api/image/static/{filename}"
+        "url": drawing_url(room_id, filename)
     }
 
+@router.get("/strokes/{room_id}")
+async def render_strokes(room_id: str):
+    """
+    Rasterize the room's stroke log as it is now
+    """
+    log = stroke_store.get(room_id)
+    if log is None or not log.batches:
+        raise HTTPException(status_code=404, detail="No strokes found")
+    data = await transcoder.run(rasterize_png, log.segments())
+    return Response(content=data, media_type="image/png", headers={"Cache-Control": "no-store"})
+
 @router.get("/get-drawing/{room_id}")
 async def get_drawing(room_id: str):
     """
-    Get the latest drawing in the room
+    Get the current drawing in the room
     """
-    files = [f for f in os.listdir(UPLOAD_DIR) if f.startswith(room_id)]
-    if not files:
+    filename = drawing_store.current_filename(room_id)
+    if filename is None and drawing_store.disk_mode != "off":
+        # Uploaded through another worker sharing the room store
+        room = rooms.get(room_id)
+        filename = room.current_drawing if room is not None else None
+    if filename is None:
         return {"status": "error", "message": "No drawing found"}
-    
-    latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(UPLOAD_DIR, x)))
-    return {
-        "status": "success",
-        "filename": latest_file,
-        "url": f"/api/image/static/{latest_file}"
-    }
 
+    drawing = drawing_store.get(room_id)
+    return JSONResponse(
+        content={
+            "status": "success",
+            "filename": filename,
+            "url": drawing_url(room_id, filename),
+            "variants": drawing.variants_payload() if drawing is not None and drawing.filename == filename else []
+        },
+        headers={"Cache-Control": "no-cache", "ETag": drawing_etag(filename)}
+    )
+
+@router.get("/drawing/{room_id}/{filename}")
+async def serve_drawing(room_id: str, filename: str, request: Request):
+    """
+    Serve a drawing from memory, or from the disk tier if it was spilled
+    """
+    etag = drawing_etag(filename)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    drawing = drawing_store.get(room_id)
+    stored = drawing.find(filename) if drawing is not None else None
+    if stored is not None:
+        return Response(content=stored.data, media_type=stored.content_type, headers=headers)
+
+    file_path = UPLOAD_DIR / filename
+    if (
+        drawing_store.disk_mode != "off"
+        and filename.startswith(f"{room_id}_")
+        and file_path.name == filename
+        and file_path.is_file()
+    ):
+        return FileResponse(file_path, headers=headers)
+    raise HTTPException(status_code=404, detail="Drawing not found")
@@ -0,0 +1,108 @@
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+# Use orjson for encoding when it is installed, it is several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# MessagePack is optional: without it only JSON is offered to clients
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Websocket subprotocols, in order of preference
+MSGPACK_SUBPROTOCOL = "doodle.msgpack"
+JSON_SUBPROTOCOL = "doodle.json"
+
+Frame = Union[str, bytes]
+
+def encode_json(message: dict) -> str:
+    """
+    Encode a message to a JSON text frame
+    """
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+def decode_json(frame: Union[str, bytes]) -> dict:
+    if orjson is not None:
+        return orjson.loads(frame)
+    return json.loads(frame)
+
+def encode_msgpack(message: dict) -> bytes:
+    """
+    Encode a message to a MessagePack binary frame
+    """
+    return msgpack.packb(message, use_bin_type=True)
+
+def decode_msgpack(frame: bytes) -> dict:
+    return msgpack.unpackb(frame, raw=False)
+
+ENCODERS = {
+    "json": encode_json,
+    "msgpack": encode_msgpack
+}
+
+def decode_frame(text: Optional[str], data: Optional[bytes]) -> dict:
+    """
+    Decode a received frame: text frames are JSON and binary frames MessagePack
+    """
+    if text is not None:
+        return decode_json(text)
+    return decode_msgpack(data)
+
+def negotiate(offered: List[str]) -> Tuple[str, Optional[str]]:
+    """
+    Choose the codec of a connection from the subprotocols offered by the client
+    Args:
+        offered (List[str]): The Sec-WebSocket-Protocol values sent by the client
+    Returns:
+        Tuple[str, Optional[str]]: The codec name and the subprotocol to accept, None if the client offered none we speak
+    """
+    if MSGPACK_SUBPROTOCOL in offered and msgpack is not None:
+        return "msgpack", MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return "json", JSON_SUBPROTOCOL
+    return "json", None
+
+class Frames:
+    """
+    The encodings of one outbound message, each made at most once and shared by all recipients
+    A message has a full variant and, if it carries a player list, a delta variant.
+    """
+    __slots__ = ("message", "delta_message", "encoded", "has_delta")
+
+    def __init__(
+        self,
+        message: Optional[dict] = None,
+        delta_message: Optional[dict] = None,
+        frame: Optional[str] = None,
+        delta_frame: Optional[str] = None
+    ):
+        self.message = message
+        self.delta_message = delta_message
+        # (codec, delta) -> frame
+        self.encoded: Dict[Tuple[str, bool], Frame] = {}
+        if frame is not None:
+            self.encoded["json", False] = frame
+        if delta_frame is not None:
+            self.encoded["json", True] = delta_frame
+        self.has_delta = delta_message is not None or delta_frame is not None
+
+    def get(self, codec: str, delta: bool = False) -> Frame:
+        delta = delta and self.has_delta
+        frame = self.encoded.get((codec, delta))
+        if frame is None:
+            message = self.delta_message if delta else self.message
+            if message is None:
+                # Frames received from other workers only come as JSON: decode once to re-encode
+                message = decode_json(self.encoded["json", delta])
+                if delta:
+                    self.delta_message = message
+                else:
+                    self.message = message
+            frame = self.encoded[codec, delta] = ENCODERS[codec](message)
+        return frame
@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from server.store import ROOM_STORE
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+IMAGES_DIR = ROOT_DIR / "public" / "images"
+
+# Drawing store configuration
+DRAWING_STORE_MAX_BYTES = int(os.getenv("DRAWING_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Disk tier: "spill" writes drawings evicted from memory, "always" writes every drawing
+# (needed when workers share rooms through the SQLite store), "off" never touches disk
+DRAWING_DISK = os.getenv("DRAWING_DISK") or ("always" if ROOM_STORE == "sqlite" else "spill")
+
+# Images directory janitor
+DRAWING_JANITOR_INTERVAL = float(os.getenv("DRAWING_JANITOR_INTERVAL", "30"))  # Seconds between sweeps
+DRAWING_JANITOR_BATCH = int(os.getenv("DRAWING_JANITOR_BATCH", "100"))  # Files removed per thread call
+DRAWING_TTL = float(os.getenv("DRAWING_TTL", "3600"))  # Seconds before any drawing file is removed
+DRAWING_DISK_MAX_BYTES = int(os.getenv("DRAWING_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+CONTENT_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+def drawing_url(room_id: str, filename: str) -> str:
+    return f"/api/image/drawing/{room_id}/{filename}"
+
+def drawing_etag(filename: str) -> str:
+    # Stored names end with the content hash, which makes it a strong validator
+    return f'"{Path(filename).stem.rsplit("_", 1)[-1]}"'
+
+class Drawing:
+    """
+    The bytes of a stored drawing, and its transcoded variants keyed by name
+    """
+    __slots__ = ("room_id", "filename", "data", "etag", "content_type", "width", "variants")
+
+    def __init__(self, room_id: str, filename: str, data: bytes, width: Optional[int] = None):
+        self.room_id = room_id
+        self.filename = filename
+        self.data = data
+        self.etag = drawing_etag(filename)
+        self.content_type = CONTENT_TYPES.get(Path(filename).suffix, "application/octet-stream")
+        self.width = width
+        self.variants: Dict[str, "Drawing"] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + sum(len(variant.data) for variant in self.variants.values())
+
+    def find(self, filename: str) -> Optional["Drawing"]:
+        """
+        The drawing or the variant stored under a filename
+        """
+        if filename == self.filename:
+            return self
+        for variant in self.variants.values():
+            if variant.filename == filename:
+                return variant
+        return None
+
+    def variants_payload(self) -> List[dict]:
+        """
+        Describe the variants for clients choosing one by viewport
+        """
+        return [
+            {
+                "name": name,
+                "url": drawing_url(self.room_id, variant.filename),
+                "type": variant.content_type,
+                "width": variant.width,
+                "bytes": len(variant.data)
+            }
+            for name, variant in (("original", self), *self.variants.items())
+        ]
+
+class DrawingStore:
+    """
+    Keep the current drawing of each room in memory, bounded by total bytes
+    Least recently used drawings are evicted first and, unless the disk tier is off, written to disk.
+    """
+    def __init__(self, max_bytes: int = DRAWING_STORE_MAX_BYTES, disk_mode: str = DRAWING_DISK):
+        self.max_bytes = max_bytes
+        self.disk_mode = disk_mode
+        self.drawings: "OrderedDict[str, Drawing]" = OrderedDict()
+        self.size = 0
+        # room_id -> filename of drawings that only exist on disk
+        self.spilled: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.drawings)
+
+    def put(self, drawing: Drawing):
+        """
+        Make a drawing the current drawing of its room
+        """
+        self.discard(drawing.room_id)
+        self.drawings[drawing.room_id] = drawing
+        self.size += drawing.nbytes
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes and len(self.drawings) > 1:
+            _, evicted = self.drawings.popitem(last=False)
+            self.size -= evicted.nbytes
+            if self.disk_mode != "off":
+                self.spill(evicted)
+
+    async def add(self, drawing: Drawing) -> bool:
+        """
+        Store a new drawing, writing it through to disk when the disk tier is "always"
+        Returns:
+            bool: Whether the same drawing was already stored
+        """
+        current = self.get(drawing.room_id)
+        if current is not None and current.filename == drawing.filename:
+            return True
+        self.put(drawing)
+        if self.disk_mode != "always":
+            return False
+        file_path = IMAGES_DIR / drawing.filename
+        if file_path.exists():
+            # Same drawing already stored: mark it as the latest instead of writing it again
+            os.utime(file_path)
+            return True
+        await self.write(drawing)
+        return False
+
+    async def attach_variants(self, drawing: Drawing, variants: Dict[str, Drawing]):
+        """
+        Add transcoded variants to a stored drawing
+        """
+        if self.drawings.get(drawing.room_id) is drawing:
+            self.size += sum(len(variant.data) for variant in variants.values())
+            drawing.variants = variants
+            self.evict()
+        else:
+            drawing.variants = variants
+        if self.disk_mode == "always":
+            for variant in variants.values():
+                await self.write(variant)
+
+    def get(self, room_id: str) -> Optional[Drawing]:
+        drawing = self.drawings.get(room_id)
+        if drawing is not None:
+            self.drawings.move_to_end(room_id)
+        return drawing
+
+    def current_filename(self, room_id: str) -> Optional[str]:
+        drawing = self.get(room_id)
+        if drawing is not None:
+            return drawing.filename
+        return self.spilled.get(room_id)
+
+    async def load(self, room_id: str, filename: str) -> Optional[Drawing]:
+        """
+        Make a drawing current, reading it back from the disk tier if it is not in memory
+        """
+        drawing = self.get(room_id)
+        if drawing is not None and drawing.filename == filename:
+            return drawing
+        if self.disk_mode == "off":
+            return None
+        try:
+            data = await asyncio.to_thread((IMAGES_DIR / filename).read_bytes)
+        except OSError:
+            return None
+        drawing = Drawing(room_id, filename, data)
+        self.put(drawing)
+        return drawing
+
+    def discard(self, room_id: str):
+        drawing = self.drawings.pop(room_id, None)
+        if drawing is not None:
+            self.size -= drawing.nbytes
+        self.spilled.pop(room_id, None)
+
+    def spill(self, drawing: Drawing):
+        self.spilled[drawing.room_id] = drawing.filename
+        if self.disk_mode == "always":
+            # Already written when it was stored
+            return
+        loop = asyncio.get_running_loop()
+        for stored in (drawing, *drawing.variants.values()):
+            loop.create_task(self.write(stored))
+
+    async def write(self, drawing: Drawing):
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = IMAGES_DIR / f".upload-{uuid.uuid4().hex}.part"
+        try:
+            await asyncio.to_thread(temp_path.write_bytes, drawing.data)
+            os.replace(temp_path, IMAGES_DIR / drawing.filename)
+        except OSError as e:
+            logger.error(f"Error writing drawing {drawing.filename} to disk: {str(e)}")
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
+
+    def protected(self) -> Set[str]:
+        """
+        Filenames of the current drawings, which the janitor must keep
+        """
+        return {
+            stored.filename
+            for drawing in self.drawings.values()
+            for stored in (drawing, *drawing.variants.values())
+        } | set(self.spilled.values())
+
+    def forget(self, filenames: Set[str]):
+        for room_id, filename in list(self.spilled.items()):
+            if filename in filenames:
+                del self.spilled[room_id]
+
+class DrawingJanitor:
+    """
+    Remove drawing files off the event loop: drawings of finished rounds and deleted rooms,
+    files older than DRAWING_TTL and the oldest files beyond DRAWING_DISK_MAX_BYTES
+    """
+    def __init__(self, store: DrawingStore, directory: Path = IMAGES_DIR):
+        self.store = store
+        self.directory = directory
+        # room_id -> time the room's drawings became obsolete
+        self.pending: Dict[str, float] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def schedule(self, room_id: str):
+        """
+        Remove the room's drawings that exist now, keeping any uploaded after this call
+        """
+        self.pending[room_id] = time.time()
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def start(self):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), DRAWING_JANITOR_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error cleaning up drawings: {str(e)}")
+
+    async def sweep(self) -> int:
+        """
+        Run one cleanup pass
+        Returns:
+            int: Number of files removed
+        """
+        pending, self.pending = self.pending, {}
+        victims = await asyncio.to_thread(self.select, pending, self.store.protected(), time.time())
+        removed = 0
+        for start in range(0, len(victims), DRAWING_JANITOR_BATCH):
+            removed += await asyncio.to_thread(self.remove, victims[start:start + DRAWING_JANITOR_BATCH])
+        if victims:
+            self.store.forget(set(victims))
+            logger.info(f"Removed {removed} drawing files")
+        return removed
+
+    def select(self, pending: Dict[str, float], protected: Set[str], now: float) -> List[str]:
+        """
+        Scan the directory once and pick the files to remove
+        """
+        victims = []
+        kept = []  # (mtime, size, name)
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                name = entry.name
+                if name.startswith(".upload-"):
+                    # Leftover of an interrupted write
+                    if now - stat.st_mtime > 60:
+                        victims.append(name)
+                    continue
+                if name in protected:
+                    total += stat.st_size
+                    continue
+                obsolete_since = pending.get(name.split("_", 1)[0])
+                if obsolete_since is not None and stat.st_mtime <= obsolete_since:
+                    victims.append(name)
+                elif now - stat.st_mtime > DRAWING_TTL:
+                    victims.append(name)
+                else:
+                    kept.append((stat.st_mtime, stat.st_size, name))
+                    total += stat.st_size
+        # Over quota: remove the oldest files first
+        kept.sort()
+        for _, size, name in kept:
+            if total <= DRAWING_DISK_MAX_BYTES:
+                break
+            victims.append(name)
+            total -= size
+        return victims
+
+    def remove(self, names: List[str]) -> int:
+        removed = 0
+        for name in names:
+            try:
+                os.remove(self.directory / name)
+                removed += 1
+            except FileNotFoundError:
+                # Already removed by another worker
+                pass
+            except OSError as e:
+                logger.error(f"Error removing drawing file {name}: {str(e)}")
+        return removed
+
+drawing_store = DrawingStore()
+drawing_janitor = DrawingJanitor(drawing_store)
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+JUDGE_CACHE_SIZE = int(os.getenv("JUDGE_CACHE_SIZE", "10000"))
+JUDGE_CACHE_TTL = float(os.getenv("JUDGE_CACHE_TTL", str(7 * 24 * 3600)))
+JUDGE_CACHE_PATH = os.getenv("JUDGE_CACHE_PATH")  # Optional on-disk snapshot
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a keyword or guess for cache lookups
+    Full-width characters are folded to half-width, case is folded,
+    punctuation is dropped and whitespace is collapsed.
+    """
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    stripped = "".join(
+        " " if unicodedata.category(ch).startswith(("P", "S")) else ch
+        for ch in text
+    )
+    stripped = _WHITESPACE.sub(" ", stripped).strip()
+    # Keep guesses made only of symbols distinguishable from each other
+    return stripped or _WHITESPACE.sub(" ", text).strip()
+
+class JudgmentCache:
+    """
+    LRU/TTL cache of AI verdicts keyed on normalized (keyword, guess) pairs
+    """
+    def __init__(self, max_size: int = JUDGE_CACHE_SIZE, ttl: float = JUDGE_CACHE_TTL, path: Optional[str] = JUDGE_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        # key -> (expires_at, verdict)
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(keyword: str, guess: str) -> Tuple[str, str]:
+        return normalize_text(keyword), normalize_text(guess)
+
+    def get(self, keyword: str, guess: str) -> Optional[dict]:
+        key = self.make_key(keyword, guess)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, verdict = entry
+        if expires_at < time.time():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return verdict
+
+    def set(self, keyword: str, guess: str, verdict: dict):
+        key = self.make_key(keyword, guess)
+        self.entries[key] = (time.time() + self.ttl, {
+            "is_correct": verdict["is_correct"],
+            "reason": verdict["reason"]
+        })
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def lookup(self, keyword: str, guesses: List[str]) -> List[Optional[dict]]:
+        """
+        Look up every guess, returning the cached judgment or None for a miss
+        """
+        results = []
+        for guess in guesses:
+            verdict = self.get(keyword, guess)
+            results.append({**verdict, "guess": guess} if verdict else None)
+        return results
+
+    def load(self):
+        """
+        Load the on-disk snapshot, skipping expired entries
+        """
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            now = time.time()
+            for keyword, guess, expires_at, verdict in snapshot:
+                if expires_at > now:
+                    self.entries[(keyword, guess)] = (expires_at, verdict)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            logger.info(f"Loaded {len(self.entries)} cached judgments from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading judgment cache from {self.path}: {e}")
+
+    def _write_snapshot(self, snapshot: list):
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """
+        Write the cache to the on-disk snapshot without blocking the event loop
+        """
+        if not self.path:
+            return
+        snapshot = [
+            [keyword, guess, expires_at, verdict]
+            for (keyword, guess), (expires_at, verdict) in self.entries.items()
+        ]
+        try:
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+            logger.info(f"Saved {len(snapshot)} cached judgments to {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving judgment cache to {self.path}: {e}")
+
+judgment_cache = JudgmentCache()
+judgment_cache.load()
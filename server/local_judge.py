@@ -0,0 +1,232 @@
+import difflib
+import importlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from server.judge_cache import normalize_text
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Local judge configuration
+JUDGE_LOCAL_ENGINE = os.getenv("JUDGE_LOCAL_ENGINE", "lexical")  # lexical, off, or module:Class of a JudgeEngine
+JUDGE_LOCAL_THRESHOLD = float(os.getenv("JUDGE_LOCAL_THRESHOLD", "0.9"))  # Confidence to skip the AI
+JUDGE_LOCAL_FALLBACK_THRESHOLD = float(os.getenv("JUDGE_LOCAL_FALLBACK_THRESHOLD", "0.6"))  # Confidence when the AI is unavailable
+JUDGE_ALIASES_PATH = os.getenv("JUDGE_ALIASES_PATH")  # Extra alias groups, merged with the bundled table
+
+BUNDLED_ALIASES_PATH = Path(__file__).parent / "judge_aliases.json"
+
+# Confidence of each kind of evidence
+EXACT_CONFIDENCE = 1.0
+FORM_CONFIDENCE = 0.97
+ALIAS_CONFIDENCE = 0.95
+UNRELATED_ALIAS_CONFIDENCE = 0.9
+TYPO_CONFIDENCE = 0.75
+CONTAINS_CONFIDENCE = 0.7
+DISSIMILAR_CONFIDENCE = 0.6
+
+# Unrelated when below this similarity ratio and sharing no word
+DISSIMILAR_RATIO = 0.25
+
+_CJK = re.compile(r"[぀-ヿ㐀-鿿豈-﫿]")
+_LEADING_ARTICLES = {"a", "an", "the", "some", "un", "une", "le", "la", "les", "el", "los", "las", "der", "die", "das", "ein", "eine", "il", "lo", "uno"}
+# Chinese "one" + measure word, as in 一只猫
+_LEADING_MEASURE = re.compile(r"^[一两几][个只条头匹把辆棵张朵座本支架艘台件双顶块]")
+_IRREGULAR_PLURALS = {
+    "men": "man", "women": "woman", "children": "child", "people": "person", "mice": "mouse",
+    "geese": "goose", "feet": "foot", "teeth": "tooth", "leaves": "leaf", "knives": "knife",
+    "wolves": "wolf", "sheep": "sheep", "fish": "fish", "deer": "deer", "glasses": "glasses"
+}
+
+REASONS = {
+    "en": {
+        "empty": "No answer was given",
+        "exact": "The answer is the same as the reference",
+        "form": "The answer is another form of the reference",
+        "alias": "The answer is a synonym or translation of the reference",
+        "unrelated": "The answer names something different from the reference",
+        "typo": "The answer looks like a misspelling of the reference",
+        "contains": "The answer contains the reference",
+        "dissimilar": "The answer is unrelated to the reference"
+    },
+    "zh": {
+        "empty": "没有给出答案",
+        "exact": "答案与参考答案相同",
+        "form": "答案是参考答案的另一种形式",
+        "alias": "答案是参考答案的同义词或翻译",
+        "unrelated": "答案指的是与参考答案不同的事物",
+        "typo": "答案看起来是参考答案的拼写错误",
+        "contains": "答案包含参考答案",
+        "dissimilar": "答案与参考答案无关"
+    }
+}
+
+def singular(word: str) -> str:
+    """
+    Reduce an English plural to its singular with a few suffix rules
+    """
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes", "zes", "oes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def canonical(text: str) -> str:
+    """
+    Normalize a keyword or guess and drop leading articles and measure words
+    """
+    text = normalize_text(text)
+    words = text.split(" ")
+    while len(words) > 1 and words[0] in _LEADING_ARTICLES:
+        words.pop(0)
+    text = " ".join(words)
+    stripped = _LEADING_MEASURE.sub("", text)
+    return stripped or text
+
+def base_form(text: str) -> str:
+    """
+    The canonical text with the last word singularized and spaces removed
+    """
+    words = text.split(" ")
+    words[-1] = singular(words[-1])
+    return "".join(words)
+
+def within_one_edit(a: str, b: str) -> bool:
+    """
+    Whether a and b differ by at most one insertion, deletion, substitution or swap of adjacent characters
+    """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        return len(diffs) <= 1 or (len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+class JudgeEngine:
+    """
+    Interface of local judge engines
+    An engine settles the guesses it is confident about and leaves the rest to the AI.
+    """
+    def assess(self, keyword: str, guess: str) -> Tuple[Optional[bool], float, str]:
+        """
+        Judge one guess
+        Args:
+            keyword (str): The reference answer
+            guess (str): The candidate answer
+        Returns:
+            Tuple[Optional[bool], float, str]: The verdict (None if unknown), its confidence and a reason
+        """
+        raise NotImplementedError
+
+    def judge(self, keyword: str, guesses: List[str], threshold: float = JUDGE_LOCAL_THRESHOLD) -> List[Optional[dict]]:
+        """
+        Judge every guess, returning the judgment or None when the confidence is below the threshold
+        """
+        results = []
+        for guess in guesses:
+            is_correct, confidence, reason = self.assess(keyword, guess)
+            if is_correct is None or confidence < threshold:
+                results.append(None)
+            else:
+                results.append({"is_correct": is_correct, "reason": reason, "guess": guess})
+        return results
+
+class LexicalJudge(JudgeEngine):
+    """
+    Judge by normalized text, English plural forms, a multilingual alias table and string similarity
+    """
+    def __init__(self, paths: Optional[List[Path]] = None):
+        # canonical base form -> ids of the alias groups it belongs to
+        self.aliases: Dict[str, FrozenSet[int]] = {}
+        for path in paths if paths is not None else self.default_paths():
+            self.load(path)
+
+    @staticmethod
+    def default_paths() -> List[Path]:
+        paths = [BUNDLED_ALIASES_PATH]
+        if JUDGE_ALIASES_PATH:
+            paths.append(Path(JUDGE_ALIASES_PATH))
+        return paths
+
+    def load(self, path: Path):
+        """
+        Add the alias groups of a JSON file shaped like judge_aliases.json
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                groups = json.load(f)["groups"]
+        except Exception as e:
+            logger.error(f"Error loading judge aliases from {path}: {e}")
+            return
+        # Continue numbering after the groups already loaded
+        offset = 1 + max((max(ids) for ids in self.aliases.values()), default=-1)
+        for group_id, words in enumerate(groups, offset):
+            for word in words:
+                form = base_form(canonical(word))
+                if form:
+                    self.aliases[form] = self.aliases.get(form, frozenset()) | {group_id}
+        logger.info(f"Loaded {len(groups)} judge alias groups from {path}")
+
+    def assess(self, keyword: str, guess: str) -> Tuple[Optional[bool], float, str]:
+        reasons = REASONS["zh"] if _CJK.search(keyword) else REASONS["en"]
+        reference, answer = canonical(keyword), canonical(guess)
+        if not answer:
+            return False, EXACT_CONFIDENCE, reasons["empty"]
+        if reference == answer:
+            return True, EXACT_CONFIDENCE, reasons["exact"]
+
+        reference_form, answer_form = base_form(reference), base_form(answer)
+        if reference_form == answer_form:
+            return True, FORM_CONFIDENCE, reasons["form"]
+
+        reference_groups = self.aliases.get(reference_form)
+        answer_groups = self.aliases.get(answer_form)
+        if reference_groups and answer_groups:
+            if reference_groups & answer_groups:
+                return True, ALIAS_CONFIDENCE, reasons["alias"]
+            return False, UNRELATED_ALIAS_CONFIDENCE, reasons["unrelated"]
+
+        # Weaker evidence, only used when the AI is unavailable
+        if len(reference_form) >= 4 and within_one_edit(reference_form, answer_form):
+            return True, TYPO_CONFIDENCE, reasons["typo"]
+        if reference in answer.split(" ") or (_CJK.search(reference) and reference in answer):
+            return True, CONTAINS_CONFIDENCE, reasons["contains"]
+        if (
+            not set(reference.split(" ")) & set(answer.split(" "))
+            and difflib.SequenceMatcher(None, reference_form, answer_form).ratio() < DISSIMILAR_RATIO
+        ):
+            return False, DISSIMILAR_CONFIDENCE, reasons["dissimilar"]
+        return None, 0.0, ""
+
+def load_engine(spec: str = JUDGE_LOCAL_ENGINE) -> Optional[JudgeEngine]:
+    """
+    Create the configured local judge engine
+    Args:
+        spec (str): "lexical", "off", or "module:Class" naming a JudgeEngine subclass
+    Returns:
+        Optional[JudgeEngine]: The engine, or None if local judging is off
+    """
+    if spec == "off":
+        return None
+    if spec == "lexical":
+        return LexicalJudge()
+    module_name, _, class_name = spec.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)()
+    except Exception as e:
+        logger.error(f"Error loading judge engine {spec}, falling back to the lexical engine: {e}")
+        return LexicalJudge()
+
+local_judge = load_engine()
@@ -1,10 +1,18 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from .api import game, image
-from .websocket import manager, event_handlers, handle_disconnect, rooms
+from .websocket import manager, event_handlers, room_mutating_events, handle_disconnect, rooms, bus
+from .ai import close_clients
+from .judge_cache import judgment_cache
+from .drawings import drawing_janitor, drawing_store
+from .transcode import transcoder
+from .codec import decode_frame
+from .ratelimit import rate_limiter
+from . import metrics
+import time
 import logging
 
 # Set up logging
@@ -31,6 +39,25 @@ app.mount("/images", StaticFiles(directory=str(IMAGES_DIR)), name="images")
 app.include_router(game.router)
 app.include_router(image.router)
 
+@app.on_event("startup")
+async def startup():
+    # Deliver broadcasts published by other workers to our sockets
+    await bus.start(manager.deliver)
+    # Remove obsolete drawing files in the background
+    await drawing_janitor.start()
+    # Image transcoding and stroke rendering run in a process pool
+    transcoder.open()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await bus.stop()
+    await drawing_janitor.stop()
+    transcoder.close()
+    # Release the shared AI client connection pools
+    await close_clients()
+    # Persist cached verdicts so they survive restarts
+    await judgment_cache.save()
+
 # Error handling
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -50,16 +77,46 @@ async def general_exception_handler(request, exc):
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
+    # Clients opt in to player patches with ?deltas=1
+    await manager.connect(websocket, client_id, deltas=websocket.query_params.get("deltas") == "1")
     try:
         while True:
-            data = await websocket.receive_json()
-            logger.info(f"Received message from client {client_id}: {data}")
+            # Text frames carry JSON and binary frames MessagePack, whichever codec was negotiated for sending
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = decode_frame(message.get("text"), message.get("bytes"))
+            logger.debug("Received message from client %s: %s", client_id, data)
             event = data.get("event")
-            if event in event_handlers:
-                await event_handlers[event](websocket, client_id, data)
-            else:
+            if event not in event_handlers:
                 logger.warning(f"Unknown event type received: {event}")
+                continue
+            room_id = data.get("roomId")
+            limited = rate_limiter.admit(client_id, room_id, event, rooms.__contains__)
+            if limited is not None:
+                scope, bucket = limited
+                metrics.events_limited.inc(event, scope)
+                # Tell the client once per burst of rejections, not for every dropped event
+                if bucket.rejected == 1:
+                    logger.warning(f"Rate limited {event} from client {client_id} ({scope})")
+                    manager.send(client_id, {
+                        "event": "rate_limited",
+                        "rejected": event,
+                        "retryAfter": round(bucket.retry_after(), 3)
+                    })
+                continue
+            started = time.perf_counter()
+            try:
+                if event in room_mutating_events and room_id is not None:
+                    async with rooms.lock(room_id):
+                        await event_handlers[event](websocket, client_id, data)
+                else:
+                    await event_handlers[event](websocket, client_id, data)
+            except Exception:
+                metrics.event_errors.inc(event)
+                raise
+            finally:
+                metrics.event_duration.observe(time.perf_counter() - started, event)
     except WebSocketDisconnect:
         logger.info(f"Client {client_id} disconnected")
         await handle_disconnect(client_id)
@@ -67,6 +124,20 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         logger.error(f"Error processing message from client {client_id}: {str(e)}")
         await handle_disconnect(client_id)
 
+# Gauges read when /metrics is scraped
+metrics.register_gauge("doodle_ws_connections", "Active websocket connections", lambda: len(manager.active_connections))
+metrics.register_gauge("doodle_rooms", "Rooms in the room store", lambda: len(rooms))
+metrics.register_gauge("doodle_ws_queued_messages", "Messages waiting in outbound queues", lambda: manager.stats()["queued_messages"])
+metrics.register_gauge("doodle_ws_dropped_messages", "Outbound messages dropped for slow consumers", lambda: manager.stats()["dropped_messages"])
+metrics.register_gauge("doodle_drawing_store_bytes", "Bytes of drawings held in memory", lambda: drawing_store.size)
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Export metrics in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "DoodleGuess API is running"}
@@ -80,11 +151,18 @@ async def get_rooms():
     return {
         "rooms": {
             room_id: {
-                "players": room["players"],
-                "status": room["status"],
-                "currentRound": room["currentRound"],
-                "totalRounds": room["totalRounds"]
+                "players": room.players_payload(),
+                "status": room.status,
+                "currentRound": room.current_round,
+                "totalRounds": room.total_rounds
             }
             for room_id, room in rooms.items()
         }
     }
+
+@app.get("/debug/connections")
+async def get_connections():
+    """
+    Get outbound queue counters of all connections (for debugging purposes)
+    """
+    return manager.stats()
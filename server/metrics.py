@@ -0,0 +1,147 @@
+import bisect
+import math
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Minimal Prometheus text-format metrics. Recording is a dict lookup and a few integer
+# updates, cheap enough for every websocket event; values are rendered only when scraped.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+def format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}")
+        return lines
+
+class Gauge:
+    """
+    A value read from a callback when scraped
+    """
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {format_value(self.read())}"
+        ]
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self.series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Websocket events
+event_duration = registry.register(Histogram(
+    "doodle_ws_event_duration_seconds", "Time spent handling a websocket event", LATENCY_BUCKETS, ["event"]
+))
+event_errors = registry.register(Counter(
+    "doodle_ws_event_errors_total", "Websocket events whose handler raised", ["event"]
+))
+events_limited = registry.register(Counter(
+    "doodle_ws_events_limited_total", "Websocket events rejected by rate limiting", ["event", "scope"]
+))
+events_coalesced = registry.register(Counter(
+    "doodle_ws_events_coalesced_total", "Duplicate websocket events answered by an in-flight or finished operation", ["event"]
+))
+
+# Broadcasts
+broadcast_duration = registry.register(Histogram(
+    "doodle_broadcast_duration_seconds", "Time spent encoding and queueing a room broadcast", LATENCY_BUCKETS, ["event"]
+))
+broadcast_recipients = registry.register(Histogram(
+    "doodle_broadcast_recipients", "Recipients of a room broadcast", COUNT_BUCKETS
+))
+
+# AI judge
+ai_judge_duration = registry.register(Histogram(
+    "doodle_ai_judge_duration_seconds", "Time to obtain AI judgments, including retries", AI_LATENCY_BUCKETS, ["outcome"]
+))
+ai_judge_requests = registry.register(Counter(
+    "doodle_ai_judge_requests_total", "AI judgment requests by outcome", ["outcome"]
+))
+ai_judge_retries = registry.register(Counter(
+    "doodle_ai_judge_retries_total", "AI judgment attempts that were retried"
+))
+judge_cache_lookups = registry.register(Counter(
+    "doodle_judge_cache_lookups_total", "Verdict cache lookups by result", ["result"]
+))
+local_judge_verdicts = registry.register(Counter(
+    "doodle_local_judge_verdicts_total", "Cache misses settled by the local judge, sent to the AI, or settled locally after the AI failed", ["result"]
+))
+
+# Uploads
+upload_bytes = registry.register(Histogram(
+    "doodle_upload_bytes", "Size of uploaded drawings", SIZE_BUCKETS
+))
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+    return registry.register(Gauge(name, documentation, read))
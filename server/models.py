@@ -0,0 +1,238 @@
+from typing import Dict, List, Optional, Set
+
+class Player:
+    """
+    A player in a room
+    """
+    __slots__ = (
+        "nickname",
+        "client_id",
+        "score",
+        "is_drawing",
+        "ready",
+        "correct_guesses",
+        "drawings_guessed_correctly"
+    )
+
+    def __init__(self, nickname: str, client_id: str, is_drawing: bool = False, ready: bool = False):
+        self.nickname = nickname
+        self.client_id = client_id
+        self.score = 0
+        self.is_drawing = is_drawing
+        self.ready = ready
+        self.correct_guesses = 0
+        self.drawings_guessed_correctly = 0
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the player in the format expected by the frontend
+        """
+        return {
+            "nickname": self.nickname,
+            "client_id": self.client_id,
+            "score": self.score,
+            "isDrawing": self.is_drawing,
+            "ready": self.ready,
+            "correct_guesses": self.correct_guesses,
+            "drawings_guessed_correctly": self.drawings_guessed_correctly
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Player":
+        player = cls(data["nickname"], data["client_id"], data["isDrawing"], data["ready"])
+        player.score = data["score"]
+        player.correct_guesses = data["correct_guesses"]
+        player.drawings_guessed_correctly = data["drawings_guessed_correctly"]
+        return player
+
+class Room:
+    """
+    A game room
+    Players are indexed by client_id (in join order), and the room keeps a pointer
+    to the drawer and the set of guessers who have not guessed yet.
+    """
+    __slots__ = (
+        "room_id",
+        "password",
+        "max_players",
+        "total_rounds",
+        "current_round",
+        "status",
+        "guesses",
+        "current_drawing",
+        "current_keyword",
+        "judgments_submitted",
+        "players",
+        "nicknames",
+        "drawer",
+        "outstanding",
+        "version",
+        "synced_players"
+    )
+
+    def __init__(self, room_id: str, password: str, max_players: int, total_rounds: int):
+        self.room_id = room_id
+        self.password = password
+        self.max_players = max_players
+        self.total_rounds = total_rounds
+        self.current_round = 1  # Initial round is 1
+        self.status = "waiting"
+        self.guesses: Dict[str, str] = {}
+        self.current_drawing: Optional[str] = None
+        self.current_keyword: Optional[str] = None
+        self.judgments_submitted = False
+        self.players: Dict[str, Player] = {}
+        self.nicknames: Set[str] = set()
+        self.drawer: Optional[Player] = None
+        self.outstanding: Set[str] = set()  # client_ids of guessers who have not guessed
+        self.version = 0  # Incremented every time the player list is broadcast
+        self.synced_players: Dict[str, dict] = {}  # The player list as of the current version
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def get_player(self, client_id: str) -> Optional[Player]:
+        return self.players.get(client_id)
+
+    def has_nickname(self, nickname: str) -> bool:
+        return nickname in self.nicknames
+
+    def add_player(self, player: Player):
+        self.players[player.client_id] = player
+        self.nicknames.add(player.nickname)
+        if player.is_drawing:
+            self.set_drawer(player)
+        elif player.client_id not in self.guesses:
+            self.outstanding.add(player.client_id)
+
+    def remove_player(self, client_id: str) -> Optional[Player]:
+        player = self.players.pop(client_id, None)
+        if player is None:
+            return None
+        self.nicknames.discard(player.nickname)
+        self.outstanding.discard(client_id)
+        if self.drawer is player:
+            self.drawer = None
+        return player
+
+    def set_drawer(self, player: Optional[Player]):
+        if self.drawer is not None:
+            self.drawer.is_drawing = False
+            if self.drawer.client_id in self.players and self.drawer.client_id not in self.guesses:
+                self.outstanding.add(self.drawer.client_id)
+        self.drawer = player
+        if player is not None:
+            player.is_drawing = True
+            self.outstanding.discard(player.client_id)
+
+    def rotate_drawer(self):
+        """
+        Pass the drawing role to the next player in join order
+        """
+        order = list(self.players.values())
+        if not order:
+            return
+        current = order.index(self.drawer) if self.drawer in order else 0
+        self.set_drawer(order[(current + 1) % len(order)])
+
+    def record_guess(self, client_id: str, guess: str) -> bool:
+        """
+        Record a guess
+        Returns:
+            bool: Whether all guessers have now submitted a guess
+        """
+        self.guesses[client_id] = guess
+        self.outstanding.discard(client_id)
+        return not self.outstanding
+
+    def reset_round(self):
+        self.guesses = {}
+        self.current_drawing = None
+        self.current_keyword = None
+        self.outstanding = {
+            client_id for client_id, player in self.players.items()
+            if player is not self.drawer
+        }
+
+    def players_payload(self) -> List[dict]:
+        return [player.to_dict() for player in self.players.values()]
+
+    def players_patch(self, players: List[dict]) -> dict:
+        """
+        Advance the state version and describe how the player list changed since the previous version
+        Args:
+            players (List[dict]): The serialized player list being broadcast
+        Returns:
+            dict: Only the changed fields of each player, removed players and, if it changed, the new order
+        """
+        previous = self.synced_players
+        current = {player["client_id"]: player for player in players}
+        changed = {}
+        for client_id, player in current.items():
+            old = previous.get(client_id)
+            if old is None:
+                changed[client_id] = player
+            else:
+                diff = {key: value for key, value in player.items() if old.get(key) != value}
+                if diff:
+                    changed[client_id] = diff
+        patch = {"roomId": self.room_id, "from": self.version, "to": self.version + 1, "changed": changed}
+        removed = [client_id for client_id in previous if client_id not in current]
+        if removed:
+            patch["removed"] = removed
+        if list(previous) != list(current):
+            patch["order"] = list(current)
+        self.version += 1
+        self.synced_players = current
+        return patch
+
+    def snapshot(self) -> dict:
+        """
+        The full player list as of the current version, for clients that missed a patch
+        """
+        return {
+            "roomId": self.room_id,
+            "version": self.version,
+            "players": list(self.synced_players.values())
+        }
+
+    def to_state(self) -> dict:
+        """
+        Serialize the whole room for a shared room store
+        """
+        return {
+            "room_id": self.room_id,
+            "password": self.password,
+            "max_players": self.max_players,
+            "total_rounds": self.total_rounds,
+            "current_round": self.current_round,
+            "status": self.status,
+            "guesses": self.guesses,
+            "current_drawing": self.current_drawing,
+            "current_keyword": self.current_keyword,
+            "judgments_submitted": self.judgments_submitted,
+            "players": self.players_payload(),
+            "outstanding": list(self.outstanding),
+            "version": self.version,
+            "synced_players": list(self.synced_players.values())
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Room":
+        room = cls(state["room_id"], state["password"], state["max_players"], state["total_rounds"])
+        room.current_round = state["current_round"]
+        room.status = state["status"]
+        room.guesses = state["guesses"]
+        room.current_drawing = state["current_drawing"]
+        room.current_keyword = state["current_keyword"]
+        room.judgments_submitted = state["judgments_submitted"]
+        for data in state["players"]:
+            player = Player.from_dict(data)
+            room.players[player.client_id] = player
+            room.nicknames.add(player.nickname)
+            if player.is_drawing:
+                room.drawer = player
+        room.outstanding = set(state["outstanding"])
+        room.version = state["version"]
+        room.synced_players = {player["client_id"]: player for player in state["synced_players"]}
+        return room
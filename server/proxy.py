@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Optional
+from urllib.parse import urlencode
+import httpx
+import websockets
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse
+from .codec import decode_frame, negotiate
+from .sharding import SHARD_COUNT, HashRing
+
+# Front process of the sharding supervisor (run.py --supervisor): routes every
+# request and websocket to the worker that owns the room.
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKER_HOST = os.getenv("WORKER_HOST", "127.0.0.1")
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8100"))
+SHARD_HEALTH_INTERVAL = float(os.getenv("SHARD_HEALTH_INTERVAL", "1"))
+
+# Hop-by-hop headers that must not be forwarded
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade", "content-length", "host"}
+
+ROOM_PATHS = [
+    re.compile(r"^/api/game/state/(?P<room>[^/]+)$"),
+    re.compile(r"^/api/image/get-drawing/(?P<room>[^/]+)$"),
+    re.compile(r"^/api/image/drawing/(?P<room>[^/]+)"),
+    # Drawing files are named {room_id}_...
+    re.compile(r"^/(?:images|api/image/static)/(?P<room>[^/_]+)_"),
+]
+MULTIPART_ROOM = re.compile(rb'name="room_id"\r\n\r\n([^\r]*)\r\n')
+
+app = FastAPI()
+
+# Shards that currently pass their health check
+live_ring = HashRing(range(SHARD_COUNT))
+http_client: Optional[httpx.AsyncClient] = None
+health_task: Optional[asyncio.Task] = None
+
+def worker_url(shard: int, scheme: str = "http") -> str:
+    return f"{scheme}://{WORKER_HOST}:{WORKER_BASE_PORT + shard}"
+
+def route(key: str) -> int:
+    shard = live_ring.owner(key)
+    if shard is None:
+        raise HTTPException(status_code=503, detail="No workers available")
+    return shard
+
+async def check_health():
+    """
+    Take failed workers out of the ring and put them back once they answer again
+    Only the rooms of a failed worker move; every other room keeps its owner.
+    """
+    while True:
+        for shard in range(SHARD_COUNT):
+            try:
+                response = await http_client.get(f"{worker_url(shard)}/", timeout=2)
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if healthy and shard not in live_ring.shards():
+                live_ring.add(shard)
+                logger.info(f"Worker {shard} is up, restoring its rooms")
+            elif not healthy and shard in live_ring.shards():
+                live_ring.remove(shard)
+                logger.warning(f"Worker {shard} is down, moving its rooms to the other workers")
+        await asyncio.sleep(SHARD_HEALTH_INTERVAL)
+
+@app.on_event("startup")
+async def startup():
+    global http_client, health_task
+    http_client = httpx.AsyncClient(timeout=60)
+    health_task = asyncio.create_task(check_health())
+
+@app.on_event("shutdown")
+async def shutdown():
+    if health_task:
+        health_task.cancel()
+    if http_client:
+        await http_client.aclose()
+
+def room_of_request(path: str, body: bytes) -> Optional[str]:
+    for pattern in ROOM_PATHS:
+        match = pattern.match(path)
+        if match:
+            return match.group("room")
+    if path == "/api/game/submit-guess":
+        try:
+            return str(json.loads(body)["room_id"])
+        except (ValueError, KeyError, TypeError):
+            return None
+    if path == "/api/image/upload-drawing":
+        match = MULTIPART_ROOM.search(body)
+        return match.group(1).decode("utf-8", "replace") if match else None
+    return None
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def forward_http(request: Request, path: str):
+    body = await request.body()
+    room_id = room_of_request(request.url.path, body)
+    # Requests that are not tied to a room can go to any worker
+    shard = route(room_id or request.url.path)
+    try:
+        response = await http_client.request(
+            request.method,
+            f"{worker_url(shard)}{request.url.path}",
+            params=request.query_params,
+            headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS},
+            content=body
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"Error forwarding {request.url.path} to worker {shard}: {str(e)}")
+        return JSONResponse(status_code=502, content={"message": "Worker unavailable"})
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        headers={k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+    )
+
+@app.websocket("/ws/{client_id}")
+async def forward_websocket(websocket: WebSocket, client_id: str):
+    """
+    Bind the client's socket to the worker owning the room named in its messages
+    The connection to the worker is opened lazily and moved if the client switches to a room on another worker.
+    """
+    # Negotiate like a worker would and ask the worker for the same subprotocol
+    _, subprotocol = negotiate(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    query = urlencode(list(websocket.query_params.items()))
+    backend = None
+    backend_shard = None
+    pump = None
+
+    async def pump_to_client(connection):
+        try:
+            async for message in connection:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+        except websockets.ConnectionClosed:
+            pass
+        # The worker closed the socket: close the client's too, unless we are switching workers
+        if connection is backend:
+            await websocket.close()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            text = message.get("text")
+            try:
+                room_id = decode_frame(text, message.get("bytes")).get("roomId")
+            except Exception:
+                room_id = None
+
+            if room_id is not None:
+                shard = route(str(room_id))
+            elif backend is not None:
+                shard = backend_shard
+            else:
+                # Not in a room yet (e.g. create_room): the worker mints a room ID it owns
+                shard = route(client_id)
+
+            if shard != backend_shard or backend is None:
+                if backend is not None:
+                    old = backend
+                    backend = None
+                    await old.close()
+                url = f"{worker_url(shard, 'ws')}/ws/{client_id}" + (f"?{query}" if query else "")
+                backend = await websockets.connect(url, max_size=None, subprotocols=[subprotocol] if subprotocol else None)
+                backend_shard = shard
+                pump = asyncio.create_task(pump_to_client(backend))
+
+            if text is not None:
+                await backend.send(text)
+            elif message.get("bytes") is not None:
+                await backend.send(message["bytes"])
+    except (WebSocketDisconnect, websockets.ConnectionClosed):
+        pass
+    except Exception as e:
+        logger.error(f"Error forwarding websocket of client {client_id}: {str(e)}")
+    finally:
+        if backend is not None:
+            await backend.close()
+        if pump is not None:
+            pump.cancel()
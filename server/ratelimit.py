@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")  # Overrides, e.g. "client.player_ready=1/3,room.draw_strokes=60/120"
+
+# Budgets as (tokens per second, burst), per client and per room. Client events without a
+# budget of their own use "*"; room budgets only cover events that change a room for everyone.
+CLIENT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "*": (10, 30),
+    "create_room": (0.5, 3),
+    "join_room": (1, 5),
+    "player_ready": (1, 3),
+    "submit_drawing": (0.5, 3),
+    "request_ai_judgment": (0.5, 2),
+    "submit_judgments": (0.5, 3),
+    "draw_strokes": (30, 60),  # DrawingCanvas.js flushes every 50 ms
+    "request_strokes": (2, 5),
+    "request_snapshot": (2, 5)
+}
+ROOM_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "player_ready": (2, 5),
+    "submit_drawing": (0.5, 3),
+    "request_ai_judgment": (0.5, 3),
+    "submit_judgments": (0.5, 3),
+    "draw_strokes": (60, 120)
+}
+
+def parse_overrides(spec: str):
+    """
+    Apply RATE_LIMITS overrides of the form scope.event=rate/burst to the budget tables
+    """
+    tables = {"client": CLIENT_BUDGETS, "room": ROOM_BUDGETS}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            name, budget = entry.split("=")
+            scope, event = name.split(".", 1)
+            rate, burst = budget.split("/")
+            tables[scope][event] = (float(rate), float(burst))
+        except (ValueError, KeyError):
+            logger.error(f"Ignoring invalid rate limit {entry}")
+
+parse_overrides(RATE_LIMITS)
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "rejected")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.rejected = 0  # Rejections since the last admitted event
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.rejected = 0
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+class RateLimiter:
+    """
+    Token-bucket admission control for websocket events, per client and per room
+    """
+    def __init__(self, enabled: bool = RATE_LIMIT_ENABLED):
+        self.enabled = enabled
+        # client or room ID -> event -> bucket
+        self.clients: Dict[str, Dict[str, TokenBucket]] = {}
+        self.rooms: Dict[str, Dict[str, TokenBucket]] = {}
+
+    @staticmethod
+    def bucket(buckets: Dict[str, TokenBucket], event: str, budget: Tuple[float, float]) -> TokenBucket:
+        bucket = buckets.get(event)
+        if bucket is None:
+            bucket = buckets[event] = TokenBucket(*budget)
+        return bucket
+
+    def admit(self, client_id: str, room_id: Optional[str], event: str, room_exists: Callable[[str], bool]) -> Optional[Tuple[str, TokenBucket]]:
+        """
+        Take a token for the event from the client's bucket and, for room-wide events, the room's bucket
+        Args:
+            client_id (str): The sending client
+            room_id (Optional[str]): The room named in the message
+            event (str): The event name
+            room_exists (Callable): Checked before tracking a room for the first time, so bogus IDs allocate nothing
+        Returns:
+            Optional[Tuple[str, TokenBucket]]: None if the event is admitted, otherwise the scope and bucket that rejected it
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        client_bucket = self.bucket(
+            self.clients.setdefault(client_id, {}), event, CLIENT_BUDGETS.get(event, CLIENT_BUDGETS["*"])
+        )
+        if not client_bucket.take(now):
+            return "client", client_bucket
+
+        budget = ROOM_BUDGETS.get(event)
+        if budget is None or room_id is None:
+            return None
+        buckets = self.rooms.get(room_id)
+        if buckets is None:
+            if not room_exists(room_id):
+                return None
+            buckets = self.rooms[room_id] = {}
+        room_bucket = self.bucket(buckets, event, budget)
+        if not room_bucket.take(now):
+            # The client's token was not used
+            client_bucket.tokens += 1
+            return "room", room_bucket
+        return None
+
+    def forget_client(self, client_id: str):
+        self.clients.pop(client_id, None)
+
+    def forget_room(self, room_id: str):
+        self.rooms.pop(room_id, None)
+
+class Coalescer:
+    """
+    Share the pending result of an in-flight operation with duplicate requests for the same key
+    """
+    def __init__(self):
+        self.pending: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.pending
+
+    async def run(self, key: Hashable, operation: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.create_task(operation())
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        # A waiter that is cancelled must not cancel the operation the others are waiting for
+        return await asyncio.shield(task)
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,48 @@
+import bisect
+import hashlib
+import os
+from typing import Iterable, List, Optional, Tuple
+
+# Set by the supervisor in run.py for each worker process
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))
+
+def hash_key(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Consistent hash ring mapping room IDs to worker shards
+    Removing a shard only moves the rooms it owned; every other room keeps its owner.
+    """
+    def __init__(self, shards: Iterable[int], vnodes: int = SHARD_VNODES):
+        self.vnodes = vnodes
+        self.points: List[Tuple[int, int]] = []
+        for shard in shards:
+            self.add(shard)
+
+    def add(self, shard: int):
+        for vnode in range(self.vnodes):
+            bisect.insort(self.points, (hash_key(f"shard-{shard}-{vnode}"), shard))
+
+    def remove(self, shard: int):
+        self.points = [point for point in self.points if point[1] != shard]
+
+    def shards(self) -> set:
+        return {shard for _, shard in self.points}
+
+    def owner(self, room_id: str) -> Optional[int]:
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, (hash_key(room_id), -1)) % len(self.points)
+        return self.points[index][1]
+
+# The full ring, as seen by the workers
+ring = HashRing(range(SHARD_COUNT))
+
+def owns_room(room_id: str) -> bool:
+    """
+    Whether this worker is the home shard of a room
+    """
+    return SHARD_COUNT <= 1 or ring.owner(room_id) == SHARD_INDEX
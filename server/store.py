@@ -0,0 +1,290 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from server.models import Room
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Room store configuration: "memory" for a single worker, "sqlite" to share rooms between workers
+ROOM_STORE = os.getenv("ROOM_STORE", "memory")
+ROOM_STORE_PATH = os.getenv("ROOM_STORE_PATH") or str(ROOT_DIR / "rooms.db")
+ROOM_LOCK_TIMEOUT = float(os.getenv("ROOM_LOCK_TIMEOUT", "30"))  # Seconds before an abandoned lock expires
+BUS_POLL_INTERVAL = float(os.getenv("BUS_POLL_INTERVAL", "0.02"))
+BUS_RETENTION = float(os.getenv("BUS_RETENTION", "60"))  # Seconds to keep published messages
+
+# Identifies this worker process on the bus and in room locks
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+class MemoryRoomStore:
+    """
+    Keep rooms in this process, for a single worker
+    """
+    def __init__(self):
+        self.rooms: Dict[str, Room] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self.rooms
+
+    def __getitem__(self, room_id: str) -> Room:
+        return self.rooms[room_id]
+
+    def __setitem__(self, room_id: str, room: Room):
+        self.rooms[room_id] = room
+
+    def __delitem__(self, room_id: str):
+        del self.rooms[room_id]
+        self.locks.pop(room_id, None)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def items(self) -> Iterator[Tuple[str, Room]]:
+        return iter(list(self.rooms.items()))
+
+    def add(self, room: Room) -> bool:
+        """
+        Store a new room
+        Returns:
+            bool: False if the room ID is already taken
+        """
+        if room.room_id in self.rooms:
+            return False
+        self.rooms[room.room_id] = room
+        return True
+
+    def save(self, room: Room):
+        # Rooms are live objects, there is nothing to write back
+        pass
+
+    @asynccontextmanager
+    async def lock(self, room_id: str):
+        lock = self.locks.setdefault(room_id, asyncio.Lock())
+        try:
+            async with lock:
+                yield
+        finally:
+            # Do not keep locks for room IDs that do not exist
+            if room_id not in self.rooms:
+                self.locks.pop(room_id, None)
+
+class SQLiteRoomStore:
+    """
+    Keep rooms in an SQLite database shared by all workers on the host
+    Each worker keeps the rooms it has loaded and only reloads one when another worker changed it.
+    """
+    def __init__(self, path: str = ROOM_STORE_PATH):
+        self.path = path
+        self.db = connect_sqlite(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS rooms (room_id TEXT PRIMARY KEY, rev TEXT NOT NULL, state TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS room_locks (room_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+        """)
+        # room_id -> (revision token, room), a new token is written with every save
+        self.cache: Dict[str, Tuple[str, Room]] = {}
+        self.local_locks: Dict[str, asyncio.Lock] = {}
+
+    def __contains__(self, room_id: str) -> bool:
+        return self.db.execute("SELECT 1 FROM rooms WHERE room_id = ?", (room_id,)).fetchone() is not None
+
+    def __getitem__(self, room_id: str) -> Room:
+        room = self.get(room_id)
+        if room is None:
+            raise KeyError(room_id)
+        return room
+
+    def __setitem__(self, room_id: str, room: Room):
+        self.save(room)
+
+    def __delitem__(self, room_id: str):
+        self.db.execute("DELETE FROM rooms WHERE room_id = ?", (room_id,))
+        self.cache.pop(room_id, None)
+        self.local_locks.pop(room_id, None)
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+
+    def get(self, room_id: str) -> Optional[Room]:
+        row = self.db.execute("SELECT rev FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+        if row is None:
+            self.cache.pop(room_id, None)
+            return None
+        cached = self.cache.get(room_id)
+        if cached and cached[0] == row[0]:
+            return cached[1]
+        row = self.db.execute("SELECT rev, state FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+        if row is None:
+            return None
+        room = Room.from_state(json.loads(row[1]))
+        self.cache[room_id] = (row[0], room)
+        return room
+
+    def items(self) -> Iterator[Tuple[str, Room]]:
+        room_ids = [row[0] for row in self.db.execute("SELECT room_id FROM rooms")]
+        for room_id in room_ids:
+            room = self.get(room_id)
+            if room is not None:
+                yield room_id, room
+
+    def add(self, room: Room) -> bool:
+        """
+        Store a new room
+        Returns:
+            bool: False if the room ID is already taken
+        """
+        rev = uuid.uuid4().hex
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO rooms (room_id, rev, state) VALUES (?, ?, ?)",
+            (room.room_id, rev, json.dumps(room.to_state()))
+        )
+        if cursor.rowcount != 1:
+            return False
+        self.cache[room.room_id] = (rev, room)
+        return True
+
+    def save(self, room: Room):
+        rev = uuid.uuid4().hex
+        cursor = self.db.execute(
+            "UPDATE rooms SET rev = ?, state = ? WHERE room_id = ?",
+            (rev, json.dumps(room.to_state()), room.room_id)
+        )
+        if cursor.rowcount == 1:
+            self.cache[room.room_id] = (rev, room)
+
+    @asynccontextmanager
+    async def lock(self, room_id: str):
+        """
+        Hold the room for a read-modify-write across all workers, saving it when released
+        """
+        local_lock = self.local_locks.setdefault(room_id, asyncio.Lock())
+        async with local_lock:
+            deadline = time.monotonic() + ROOM_LOCK_TIMEOUT
+            while not self._acquire(room_id):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for the lock of room {room_id}")
+                await asyncio.sleep(0.005)
+            try:
+                yield
+                cached = self.cache.get(room_id)
+                if cached:
+                    self.save(cached[1])
+            finally:
+                self.db.execute("DELETE FROM room_locks WHERE room_id = ? AND owner = ?", (room_id, WORKER_ID))
+                if room_id not in self.cache:
+                    self.local_locks.pop(room_id, None)
+
+    def _acquire(self, room_id: str) -> bool:
+        now = time.time()
+        cursor = self.db.execute(
+            """INSERT INTO room_locks (room_id, owner, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(room_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE room_locks.expires_at < ?""",
+            (room_id, WORKER_ID, now + ROOM_LOCK_TIMEOUT, now)
+        )
+        return cursor.rowcount == 1
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+# Called with (recipient client IDs, event, full frame, delta frame)
+DeliverCallback = Callable[[List[str], Optional[str], str, Optional[str]], None]
+
+class LocalBus:
+    """
+    Broadcast bus for a single worker: every recipient is local, nothing to forward
+    """
+    forwards = False
+
+    def publish(self, recipients: List[str], event: Optional[str], frame: str, delta_frame: Optional[str]):
+        pass
+
+    async def start(self, deliver: DeliverCallback):
+        pass
+
+    async def stop(self):
+        pass
+
+class SQLiteBus:
+    """
+    Forward broadcast frames to the other workers through an SQLite table they poll
+    """
+    forwards = True
+
+    def __init__(self, path: str = ROOM_STORE_PATH):
+        self.path = path
+        self.db = connect_sqlite(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS bus_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, created REAL NOT NULL, payload TEXT NOT NULL
+        )""")
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, recipients: List[str], event: Optional[str], frame: str, delta_frame: Optional[str]):
+        self.db.execute(
+            "INSERT INTO bus_messages (origin, created, payload) VALUES (?, ?, ?)",
+            (WORKER_ID, time.time(), json.dumps([recipients, event, frame, delta_frame]))
+        )
+
+    async def start(self, deliver: DeliverCallback):
+        self.task = asyncio.create_task(self.poll(deliver))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def poll(self, deliver: DeliverCallback):
+        # Polling runs on its own connection in a thread so it never blocks the event loop
+        reader = connect_sqlite(self.path)
+        last_id = reader.execute("SELECT COALESCE(MAX(id), 0) FROM bus_messages").fetchone()[0]
+        last_cleanup = time.monotonic()
+
+        def fetch(after: int) -> list:
+            return reader.execute(
+                "SELECT id, payload FROM bus_messages WHERE id > ? AND origin != ? ORDER BY id",
+                (after, WORKER_ID)
+            ).fetchall()
+
+        while True:
+            try:
+                rows = await asyncio.to_thread(fetch, last_id)
+                for message_id, payload in rows:
+                    last_id = max(last_id, message_id)
+                    deliver(*json.loads(payload))
+                if time.monotonic() - last_cleanup > BUS_RETENTION:
+                    last_cleanup = time.monotonic()
+                    await asyncio.to_thread(
+                        reader.execute, "DELETE FROM bus_messages WHERE created < ?", (time.time() - BUS_RETENTION,)
+                    )
+            except asyncio.CancelledError:
+                reader.close()
+                raise
+            except Exception as e:
+                logger.error(f"Error polling broadcast bus: {str(e)}")
+            await asyncio.sleep(BUS_POLL_INTERVAL)
+
+def create_room_store():
+    if ROOM_STORE == "sqlite":
+        logger.info(f"Using shared SQLite room store at {ROOM_STORE_PATH}")
+        return SQLiteRoomStore()
+    return MemoryRoomStore()
+
+def create_bus():
+    if ROOM_STORE == "sqlite":
+        return SQLiteBus()
+    return LocalBus()
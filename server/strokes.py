@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+from server.drawings import Drawing, drawing_store
+from server.transcode import transcoder
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Stroke streaming configuration
+CANVAS_SIZE = int(os.getenv("CANVAS_SIZE", "700"))  # Matches the drawing canvas in DrawingCanvas.js
+STROKE_BATCH_MAX_POINTS = int(os.getenv("STROKE_BATCH_MAX_POINTS", "2000"))
+STROKE_LOG_MAX_POINTS = int(os.getenv("STROKE_LOG_MAX_POINTS", "200000"))
+STROKE_MAX_WIDTH = 100
+
+COLOR_PATTERN = re.compile(r"^#[0-9a-fA-F]{6}$")
+WHITE = b"\xff\xff\xff"
+
+# A segment is a polyline of one stroke: {"i": stroke id, "c": "#rrggbb" or None for the eraser,
+# "w": line width, "p": [x0, y0, x1, y1, ...]}, or {"clear": True} to clear the canvas.
+# A stroke split over several batches repeats its last point at the start of the next segment.
+
+def normalize_segments(raw) -> Optional[List[dict]]:
+    """
+    Validate a batch of stroke segments sent by a drawer
+    Returns:
+        Optional[List[dict]]: The segments with clamped integer coordinates, or None if the batch is invalid
+    """
+    if not isinstance(raw, list) or not raw:
+        return None
+    segments = []
+    total = 0
+    for segment in raw:
+        if not isinstance(segment, dict):
+            return None
+        if segment.get("clear"):
+            segments.append({"clear": True})
+            continue
+        points = segment.get("p")
+        color = segment.get("c")
+        width = segment.get("w")
+        if (
+            not isinstance(points, list) or len(points) < 2 or len(points) % 2
+            or not all(isinstance(value, (int, float)) for value in points)
+            or (color is not None and not (isinstance(color, str) and COLOR_PATTERN.match(color)))
+            or not isinstance(width, (int, float))
+        ):
+            return None
+        total += len(points) // 2
+        if total > STROKE_BATCH_MAX_POINTS:
+            return None
+        segments.append({
+            "i": segment.get("i"),
+            "c": color,
+            "w": min(max(round(width), 1), STROKE_MAX_WIDTH),
+            "p": [min(max(round(value), 0), CANVAS_SIZE - 1) for value in points]
+        })
+    return segments
+
+class StrokeLog:
+    """
+    The stroke batches of the current round of a room, numbered from 1
+    """
+    __slots__ = ("batches", "points")
+
+    def __init__(self):
+        self.batches: List[List[dict]] = []
+        self.points = 0
+
+    @property
+    def seq(self) -> int:
+        return len(self.batches)
+
+    def segments(self, since: int = 0) -> List[dict]:
+        """
+        All segments of the batches after `since`, in order
+        """
+        return [segment for batch in self.batches[since:] for segment in batch]
+
+class StrokeStore:
+    """
+    Keep the stroke log of each room on the worker that relays its strokes
+    """
+    def __init__(self, max_points: int = STROKE_LOG_MAX_POINTS):
+        self.max_points = max_points
+        self.logs: Dict[str, StrokeLog] = {}
+
+    def get(self, room_id: str) -> Optional[StrokeLog]:
+        return self.logs.get(room_id)
+
+    def append(self, room_id: str, segments: List[dict]) -> Optional[int]:
+        """
+        Append a batch to a room's log
+        Returns:
+            Optional[int]: The batch's sequence number, or None if the log is full
+        """
+        log = self.logs.setdefault(room_id, StrokeLog())
+        points = sum(len(segment.get("p", ())) // 2 for segment in segments)
+        if log.points + points > self.max_points:
+            return None
+        log.batches.append(segments)
+        log.points += points
+        return log.seq
+
+    def discard(self, room_id: str):
+        self.logs.pop(room_id, None)
+
+def parse_color(color: Optional[str]) -> bytes:
+    # The eraser paints the background
+    if color is None:
+        return WHITE
+    return bytes.fromhex(color[1:])
+
+def disc_spans(radius: float) -> List[Tuple[int, int]]:
+    """
+    Rows of a filled disc as (dy, half width)
+    """
+    extent = int(math.ceil(radius))
+    return [
+        (dy, int(math.sqrt(max(radius * radius - dy * dy, 0))))
+        for dy in range(-extent, extent + 1)
+        if dy * dy <= radius * radius or dy == 0
+    ]
+
+def rasterize_png(segments: List[dict], size: int = CANVAS_SIZE) -> bytes:
+    """
+    Render stroke segments onto a white canvas and encode it as a PNG
+    Pure Python so it runs without optional imaging libraries; call it off the event loop.
+    """
+    row_bytes = size * 3
+    pixels = bytearray(WHITE * (size * size))
+    for segment in segments:
+        if segment.get("clear"):
+            pixels[:] = WHITE * (size * size)
+            continue
+        color_row = parse_color(segment["c"]) * size
+        radius = max(segment["w"] / 2, 0.5)
+        spans = disc_spans(radius)
+        step = max(radius / 2, 1)
+        points = segment["p"]
+
+        def stamp(cx: int, cy: int):
+            for dy, half in spans:
+                y = cy + dy
+                if 0 <= y < size:
+                    x0 = max(cx - half, 0)
+                    x1 = min(cx + half, size - 1)
+                    if x0 <= x1:
+                        offset = y * row_bytes + x0 * 3
+                        length = (x1 - x0 + 1) * 3
+                        pixels[offset:offset + length] = color_row[:length]
+
+        x, y = points[0], points[1]
+        stamp(x, y)
+        for index in range(2, len(points), 2):
+            nx, ny = points[index], points[index + 1]
+            steps = max(int(math.hypot(nx - x, ny - y) / step), 1)
+            for n in range(1, steps + 1):
+                stamp(round(x + (nx - x) * n / steps), round(y + (ny - y) * n / steps))
+            x, y = nx, ny
+    return encode_png(pixels, size, size)
+
+def encode_png(pixels: bytes, width: int, height: int) -> bytes:
+    """
+    Encode 8-bit RGB pixels as a PNG
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    row_bytes = width * 3
+    raw = b"".join(b"\x00" + pixels[y * row_bytes:(y + 1) * row_bytes] for y in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+stroke_store = StrokeStore()
+
+async def render_drawing(room_id: str, client_id: str) -> Optional[Drawing]:
+    """
+    Rasterize a room's stroke log and make it the room's current drawing
+    """
+    log = stroke_store.get(room_id)
+    if log is None or not log.batches:
+        return None
+    data = await transcoder.run(rasterize_png, log.segments())
+    drawing = Drawing(room_id, f"{room_id}_{client_id}_{hashlib.sha256(data).hexdigest()[:32]}.png", data, CANVAS_SIZE)
+    await drawing_store.add(drawing)
+    return drawing_store.get(room_id) or drawing
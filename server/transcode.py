@@ -0,0 +1,159 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from server.drawings import Drawing, drawing_store
+
+# Pillow is optional: without it drawings only get a losslessly recompressed PNG variant
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Transcoding configuration
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "2"))  # Processes per server worker, 0 runs in a thread
+TRANSCODE_TIMEOUT = float(os.getenv("TRANSCODE_TIMEOUT", "5"))  # Seconds to wait for variants before advertising
+TRANSCODE_WEBP_QUALITY = int(os.getenv("TRANSCODE_WEBP_QUALITY", "80"))
+TRANSCODE_THUMB_SIZE = int(os.getenv("TRANSCODE_THUMB_SIZE", "350"))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# name -> (extension, bytes, width)
+Variants = Dict[str, Tuple[str, bytes, int]]
+
+def png_width(data: bytes) -> Optional[int]:
+    if not data.startswith(PNG_SIGNATURE) or len(data) < 24:
+        return None
+    return struct.unpack(">I", data[16:20])[0]
+
+def recompress_png(data: bytes) -> Optional[bytes]:
+    """
+    Recompress the image data of a PNG at the highest zlib level, leaving the pixels untouched
+    """
+    position = len(PNG_SIGNATURE)
+    chunks = []
+    idat = []
+    try:
+        while position < len(data):
+            length, kind = struct.unpack(">I4s", data[position:position + 8])
+            body = data[position + 8:position + 8 + length]
+            position += 12 + length
+            if kind == b"IDAT":
+                if not idat:
+                    chunks.append((b"IDAT", None))
+                idat.append(body)
+            else:
+                chunks.append((kind, body))
+        pixels = zlib.decompress(b"".join(idat))
+    except (struct.error, zlib.error):
+        return None
+
+    output = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        if body is None:
+            body = zlib.compress(pixels, 9)
+        output.append(struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xffffffff))
+    return b"".join(output)
+
+def transcode_image(data: bytes, webp_quality: int = TRANSCODE_WEBP_QUALITY, thumb_size: int = TRANSCODE_THUMB_SIZE) -> Variants:
+    """
+    Produce the variants of an uploaded drawing; runs in the transcoding process pool
+    """
+    variants: Variants = {}
+    if Image is not None:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            output = io.BytesIO()
+            image.save(output, "WEBP", quality=webp_quality, method=4)
+            variants["webp"] = (".webp", output.getvalue(), image.width)
+            if image.width > thumb_size or image.height > thumb_size:
+                thumbnail = image.copy()
+                thumbnail.thumbnail((thumb_size, thumb_size))
+                output = io.BytesIO()
+                thumbnail.save(output, "WEBP", quality=webp_quality, method=4)
+                variants["thumb"] = (".webp", output.getvalue(), thumbnail.width)
+    width = png_width(data)
+    if width is not None:
+        optimized = recompress_png(data)
+        if optimized is not None and len(optimized) < len(data):
+            variants["optimized"] = (".png", optimized, width)
+    return variants
+
+class Transcoder:
+    """
+    Run CPU-bound image work in a process pool and attach the variants to stored drawings
+    """
+    def __init__(self, workers: int = TRANSCODE_WORKERS):
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        # filename -> transcoding job of a drawing
+        self.jobs: Dict[str, asyncio.Task] = {}
+
+    def open(self):
+        if self.workers > 0 and self.pool is None:
+            # Spawn rather than fork: the server process runs threads
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def run(self, func: Callable, *args):
+        """
+        Call a picklable function in the pool, or in a thread if the pool is disabled
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    def submit(self, drawing: Drawing):
+        """
+        Start producing the variants of a drawing, unless they exist or are in progress
+        """
+        if drawing.variants or drawing.filename in self.jobs:
+            return
+        task = asyncio.create_task(self.transcode(drawing))
+        self.jobs[drawing.filename] = task
+        task.add_done_callback(lambda _: self.jobs.pop(drawing.filename, None))
+
+    async def transcode(self, drawing: Drawing):
+        try:
+            results = await self.run(transcode_image, drawing.data, TRANSCODE_WEBP_QUALITY, TRANSCODE_THUMB_SIZE)
+        except Exception as e:
+            logger.error(f"Error transcoding drawing {drawing.filename}: {str(e)}")
+            return
+        stem = Path(drawing.filename).stem
+        variants = {
+            name: Drawing(drawing.room_id, f"{stem}-{name}{extension}", data, width)
+            for name, (extension, data, width) in results.items()
+        }
+        await drawing_store.attach_variants(drawing, variants)
+        logger.debug(
+            "Transcoded %s: %d bytes -> %s", drawing.filename, len(drawing.data),
+            {name: len(variant.data) for name, variant in variants.items()}
+        )
+
+    async def variants(self, drawing: Drawing) -> Dict[str, Drawing]:
+        """
+        The variants of a drawing, waiting up to TRANSCODE_TIMEOUT for them to be produced
+        """
+        self.submit(drawing)
+        task = self.jobs.get(drawing.filename)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), TRANSCODE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Transcoding {drawing.filename} timed out, advertising the original only")
+        return drawing.variants
+
+transcoder = Transcoder()
@@ -1,39 +1,215 @@
 import os
+import asyncio
+import time
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict
+from typing import Deque, Dict, List, Optional, Tuple
 import random
+from collections import deque
 import logging
 from pathlib import Path
-from server.ai import judge_guesses
+from server.ai import judge_batcher, new_deadline
+from server.judge_cache import judgment_cache
+from server.local_judge import JUDGE_LOCAL_FALLBACK_THRESHOLD, local_judge
+from server.codec import ENCODERS, Frame, Frames, negotiate
+from server.models import Player, Room
+from server.store import create_bus, create_room_store
+from server.sharding import owns_room
+from server.drawings import drawing_janitor, drawing_store, drawing_url
+from server.strokes import normalize_segments, render_drawing, stroke_store
+from server.transcode import transcoder
+from server.ratelimit import Coalescer, rate_limiter
+from server import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Store room and connection information
-rooms: Dict[str, dict] = {}
-socket_to_room: Dict[str, str] = {}
+rooms = create_room_store()  # Shared between workers when ROOM_STORE=sqlite
+socket_to_room: Dict[str, str] = {}  # Only for the sockets held by this worker
+bus = create_bus()
+ai_judgments_in_flight = Coalescer()  # (room ID, round) -> pending judgment
+
+# Outbound queue configuration
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "coalesce")  # drop, coalesce or disconnect
+
+class Connection:
+    """
+    A client socket with a bounded outbound queue drained by its own writer task
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        deltas: bool = False,
+        codec: str = "json",
+        max_size: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.deltas = deltas  # Whether the client receives player patches instead of full player lists
+        self.codec = codec  # Chosen at handshake: json frames are sent as text, msgpack as binary
+        self.max_size = max_size
+        self.policy = policy
+        self.queue: Deque[Tuple[Optional[str], Frame]] = deque()  # (event, encoded frame)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+        self.slow = False
+        self.writer = asyncio.create_task(self.write_loop())
+
+    def send(self, event: Optional[str], frame: Frame) -> bool:
+        """
+        Queue an encoded message without waiting for the socket, applying the slow-consumer policy when full
+        Returns:
+            bool: Whether the message was queued
+        """
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_size:
+            if self.policy == "disconnect":
+                logger.warning(f"Disconnecting slow client {self.client_id} ({len(self.queue)} queued messages)")
+                self.dropped += len(self.queue) + 1
+                self.queue.clear()
+                self.slow = True
+                self.close(code=1008)
+                return False
+            if self.policy == "coalesce":
+                # Replace the oldest queued message of the same event, or the oldest message at all
+                stale = next((m for m in self.queue if m[0] == event), self.queue[0])
+                self.queue.remove(stale)
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        self.queue.append((event, frame))
+        self.ready.set()
+        return True
+
+    async def write_loop(self):
+        try:
+            while True:
+                while not self.queue:
+                    self.ready.clear()
+                    await self.ready.wait()
+                frame = self.queue.popleft()[1]
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending to client {self.client_id}: {str(e)}")
+            self.closed = True
+
+    def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        self.writer.cancel()
+        asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        self.active_connections[client_id] = websocket
-        logger.info(f"Client {client_id} connected. Active connections: {len(self.active_connections)}")
+        self.active_connections: Dict[str, Connection] = {}
+        self.dropped_messages = 0
+        self.slow_disconnects = 0
+
+    async def connect(self, websocket: WebSocket, client_id: str, deltas: bool = False):
+        # The codec is fixed for the lifetime of the connection
+        codec, subprotocol = negotiate(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+        previous = self.active_connections.get(client_id)
+        if previous:
+            previous.writer.cancel()
+        self.active_connections[client_id] = Connection(websocket, client_id, deltas, codec)
+        logger.info(f"Client {client_id} connected ({codec}). Active connections: {len(self.active_connections)}")
 
     def disconnect(self, client_id: str):
         if client_id in self.active_connections:
-            del self.active_connections[client_id]
+            connection = self.active_connections.pop(client_id)
+            connection.writer.cancel()
+            self.dropped_messages += connection.dropped
+            self.slow_disconnects += connection.slow
             logger.info(f"Client {client_id} disconnected. Active connections: {len(self.active_connections)}")
 
-    async def broadcast_to_room(self, room_id: str, message: dict):
+    def send(self, client_id: str, message: dict):
+        """
+        Queue a message for a single client
+        """
+        connection = self.active_connections.get(client_id)
+        if connection:
+            connection.send(message.get("event"), ENCODERS[connection.codec](message))
+
+    async def broadcast_to_room(self, room_id: str, message: dict, exclude: Optional[str] = None):
         if room_id in rooms:
-            for player in rooms[room_id]["players"]:
-                if player["client_id"] in self.active_connections:
-                    await self.active_connections[player["client_id"]].send_json(message)
-            logger.info(f"Broadcast message to room {room_id}: {message}")
+            started = time.perf_counter()
+            room = rooms[room_id]
+            event = message.get("event")
+            full_message, delta_message = message, None
+            if "players" in message:
+                # Player lists are versioned; clients that opted in only get the changes
+                patch = room.players_patch(message["players"])
+                full_message = {**message, "version": room.version}
+                delta_message = {key: value for key, value in message.items() if key != "players"}
+                delta_message["players_patch"] = patch
+
+                rooms.save(room)
+
+            # Encode each variant once per codec and share the frames between all recipients, here and on other workers
+            recipients = [client_id for client_id in room.players if client_id != exclude]
+            frames = Frames(full_message, delta_message)
+            delivered = self.deliver_frames(recipients, event, frames)
+            if bus.forwards:
+                # Other workers always receive JSON and re-encode for their MessagePack clients
+                bus.publish(recipients, event, frames.get("json"), frames.get("json", True) if frames.has_delta else None)
+            metrics.broadcast_duration.observe(time.perf_counter() - started, event)
+            metrics.broadcast_recipients.observe(len(recipients))
+            logger.debug("Broadcast %s to room %s (%d local recipients)", event, room_id, delivered)
+
+    def deliver(self, recipients: List[str], event: Optional[str], frame: str, delta_frame: Optional[str]) -> int:
+        """
+        Queue JSON frames published by another worker for the recipients connected to this worker
+        Returns:
+            int: The number of local recipients
+        """
+        return self.deliver_frames(recipients, event, Frames(frame=frame, delta_frame=delta_frame))
+
+    def deliver_frames(self, recipients: List[str], event: Optional[str], frames: Frames) -> int:
+        """
+        Queue the frames matching each local recipient's codec and delta preference
+        Returns:
+            int: The number of local recipients
+        """
+        delivered = 0
+        for client_id in recipients:
+            connection = self.active_connections.get(client_id)
+            if connection:
+                connection.send(event, frames.get(connection.codec, connection.deltas))
+                delivered += 1
+        return delivered
+
+    def stats(self) -> dict:
+        """
+        Outbound queue counters for monitoring
+        """
+        depths = [len(c.queue) for c in self.active_connections.values()]
+        return {
+            "active_connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_messages": self.dropped_messages + sum(c.dropped for c in self.active_connections.values()),
+            "slow_disconnects": self.slow_disconnects
+        }
 
 manager = ConnectionManager()
 
@@ -41,35 +217,26 @@ async def handle_create_room(websocket: WebSocket, client_id: str, data: dict):
     """
     Handle creating a room
     """
-    # Generate a unique room ID
+    # Generate a unique room ID, claiming it atomically in case another worker picks the same one
     while True:
         room_id = str(random.randint(1000, 9999))
-        if room_id not in rooms:
+        # With the sharding supervisor, only mint IDs that route back to this worker
+        if room_id in rooms or not owns_room(room_id):
+            continue
+
+        # Create the room and set the creator as the drawer
+        room = Room(room_id, data["password"], data["maxPlayers"], data["rounds"])
+        room.add_player(Player(
+            data["creatorNickname"],
+            client_id,
+            is_drawing=True,  # The creator is the drawer by default
+            ready=True  # The creator is ready by default
+        ))
+        if rooms.add(room):
             break
-
-    # Create the room and set the creator as the drawer
-    rooms[room_id] = {
-        "players": [{
-            "nickname": data["creatorNickname"],
-            "client_id": client_id,
-            "score": 0,
-            "isDrawing": True,  # The creator is the drawer by default
-            "ready": True,  # The creator is ready by default
-            "correct_guesses": 0,
-            "drawings_guessed_correctly": 0  # Add new field
-        }],
-        "password": data["password"],
-        "maxPlayers": data["maxPlayers"],
-        "totalRounds": data["rounds"],
-        "currentRound": 1,  # Initial round is 1
-        "status": "waiting",
-        "guesses": {},
-        "currentDrawing": None,
-        "currentKeyword": None
-    }
     socket_to_room[client_id] = room_id
     logger.info(f"Room {room_id} created by client {client_id}")
-    await websocket.send_json({
+    manager.send(client_id, {
         "event": "room_created",
         "roomId": room_id
     })
@@ -80,44 +247,36 @@ async def handle_join_room(websocket: WebSocket, client_id: str, data: dict):
     """
     room_id = data["roomId"]
     if room_id not in rooms:
-        await websocket.send_json({"event": "error", "message": "Room not found"})
+        manager.send(client_id, {"event": "error", "message": "Room not found"})
         logger.warning(f"Attempt to join non-existent room {room_id}")
         return
 
     room = rooms[room_id]
     
     # Check password
-    if room["password"] != data.get("password"):
-        await websocket.send_json({"event": "error", "message": "Incorrect password"})
+    if room.password != data.get("password"):
+        manager.send(client_id, {"event": "error", "message": "Incorrect password"})
         logger.warning(f"Incorrect password attempt for room {room_id}")
         return
 
     # Check if the room is full
-    if len(room["players"]) >= room["maxPlayers"]:
-        await websocket.send_json({"event": "error", "message": "Room is full"})
+    if len(room) >= room.max_players:
+        manager.send(client_id, {"event": "error", "message": "Room is full"})
         logger.warning(f"Attempt to join full room {room_id}")
         return
 
     # Check if the nickname is already taken
-    if any(p["nickname"] == data["nickname"] for p in room["players"]):
-        await websocket.send_json({"event": "error", "message": "Nickname already taken"})
+    if room.has_nickname(data["nickname"]):
+        manager.send(client_id, {"event": "error", "message": "Nickname already taken"})
         logger.warning(f"Duplicate nickname attempt in room {room_id}")
         return
-    room["players"].append({
-        "nickname": data["nickname"],
-        "client_id": client_id,
-        "score": 0,
-        "isDrawing": False,
-        "ready": False,
-        "correct_guesses": 0,
-        "drawings_guessed_correctly": 0  # Add new field
-    })
+    room.add_player(Player(data["nickname"], client_id))
     socket_to_room[client_id] = room_id
     
     # Broadcast update
     await manager.broadcast_to_room(room_id, {
         "event": "player_joined",
-        "players": room["players"]
+        "players": room.players_payload()
     })
     logger.info(f"Player {data['nickname']} joined room {room_id}")
 
@@ -131,59 +290,207 @@ async def handle_submit_drawing(websocket: WebSocket, client_id: str, data: dict
         return
 
     room = rooms[room_id]
-    # Extract filename from the full URL
-    filename = Path(data["drawingUrl"]).name
-    room["currentDrawing"] = filename
-    room["currentKeyword"] = data["keyword"]
+    if data.get("strokes"):
+        # Drawn in stroke-stream mode: viewers already have the strokes, render the image for get-drawing
+        drawing = await render_drawing(room_id, client_id)
+        if drawing is None:
+            manager.send(client_id, {"event": "error", "message": "No strokes to submit"})
+            return
+        filename = drawing.filename
+    else:
+        # Extract filename from the full URL
+        filename = Path(data["drawingUrl"]).name
+        # Keep the drawing in memory for get-drawing, even if it was uploaded through another worker
+        drawing = await drawing_store.load(room_id, filename)
+    room.current_drawing = filename
+    room.current_keyword = data["keyword"]
+    # Let clients pick a resolution and format for their viewport
+    if drawing is not None:
+        await transcoder.variants(drawing)
     
     # Broadcast the new drawing to other players, using the correct URL
     await manager.broadcast_to_room(room_id, {
         "event": "new_drawing",
-        "drawingUrl": f"/images/{filename}"
+        "drawingUrl": drawing_url(room_id, filename),
+        "variants": drawing.variants_payload() if drawing is not None else [],
+        "strokes": bool(data.get("strokes"))
     })
     logger.info(f"New drawing submitted in room {room_id}")
 
+async def handle_draw_strokes(websocket: WebSocket, client_id: str, data: dict):
+    """
+    Handle a batch of stroke segments from the drawer: log it and relay it to the room
+    """
+    room_id = data["roomId"]
+    room = rooms.get(room_id)
+    if room is None or room.drawer is None or room.drawer.client_id != client_id:
+        logger.warning(f"Strokes from client {client_id} who is not drawing in room {room_id}")
+        return
+
+    segments = normalize_segments(data.get("strokes"))
+    if segments is None:
+        manager.send(client_id, {"event": "error", "message": "Invalid strokes"})
+        return
+    seq = stroke_store.append(room_id, segments)
+    if seq is None:
+        manager.send(client_id, {"event": "error", "message": "Drawing is too large"})
+        return
+
+    await manager.broadcast_to_room(room_id, {
+        "event": "strokes",
+        "roomId": room_id,
+        "seq": seq,
+        "strokes": segments
+    }, exclude=client_id)
+
+async def handle_request_strokes(websocket: WebSocket, client_id: str, data: dict):
+    """
+    Handle a request to replay a room's strokes, for late joiners and clients that missed a batch
+    """
+    room_id = data["roomId"]
+    room = rooms.get(room_id)
+    if room is None or room.get_player(client_id) is None:
+        return
+    log = stroke_store.get(room_id)
+    since = data.get("since", 0)
+    if not isinstance(since, int) or since < 0:
+        since = 0
+    manager.send(client_id, {
+        "event": "stroke_replay",
+        "roomId": room_id,
+        "seq": log.seq if log else 0,
+        "strokes": log.segments(since) if log else []
+    })
+
 async def handle_request_ai_judgment(websocket: WebSocket, client_id: str, data: dict):
     """
     Handle AI judgment request
+    A repeated request for the same room and round waits for the pending judgment instead of starting another.
     """
     room_id = data["roomId"]
     if room_id not in rooms:
         logger.warning(f"AI judgment request for non-existent room {room_id}")
         return
 
-    room = rooms[room_id]
+    key = (room_id, rooms[room_id].current_round)
+    if key in ai_judgments_in_flight:
+        metrics.events_coalesced.inc("request_ai_judgment")
+        logger.info(f"Coalesced AI judgment request from {client_id} for room {room_id}")
+    await ai_judgments_in_flight.run(key, lambda: judge_room(client_id, data))
+
+async def judge_room(client_id: str, data: dict):
+    """
+    Judge the guesses of a room's round and broadcast the verdicts, or switch the room to manual judgment
+    """
+    room_id = data["roomId"]
+    room = rooms.get(room_id)
+    if room is None:
+        return
     keyword = data["keyword"]
     guesses = data["guesses"]
 
     # Prepare input for AI judgment
     guess_list = []
+    player_ids = []
     for player_id, guess in guesses.items():
         if player_id != client_id:  # Exclude the drawer's guess
             guess_list.append(guess)
+            player_ids.append(player_id)
     logger.info(f"AI judgment request for room {room_id}: {guess_list}")
 
-    # Call AI judgment
+    def to_judgment_data(player_id: str, judgment: dict) -> Optional[dict]:
+        player = room.get_player(player_id)
+        if not player:
+            return None
+        return {
+            "player_id": player_id,
+            "nickname": player.nickname,
+            "guess": judgment["guess"],
+            "is_correct": judgment["is_correct"],
+            "reason": judgment["reason"]
+        }
+
+    # Send each verdict to the room as soon as it is known
+    partial_sends = []
+    def send_partial(index: int, judgment: dict):
+        judgment_data = to_judgment_data(player_ids[index], {**judgment, "guess": guess_list[index]})
+        if judgment_data:
+            partial_sends.append(asyncio.create_task(manager.broadcast_to_room(room_id, {
+                "event": "ai_judgment_partial",
+                "judgment": judgment_data,
+                "keyword": keyword
+            })))
+
+    # Call AI judgment within the round's deadline budget
+    deadline = new_deadline()
     try:
-        judgments = await judge_guesses(keyword, guess_list)
-        logger.info(f"AI judgments for room {room_id}: {judgments}")
+        # Only send the guesses without a cached verdict to the AI
+        judgments = judgment_cache.lookup(keyword, guess_list)
+        misses = {}
+        for index, (guess, judgment) in enumerate(zip(guess_list, judgments)):
+            if judgment is None:
+                misses.setdefault(judgment_cache.make_key(keyword, guess), []).append(index)
+            else:
+                send_partial(index, judgment)
+        missed = sum(map(len, misses.values()))
+        metrics.judge_cache_lookups.inc("hit", amount=len(guess_list) - missed)
+        metrics.judge_cache_lookups.inc("miss", amount=missed)
+        if misses:
+            miss_indexes = list(misses.values())
+            miss_guesses = [guess_list[indexes[0]] for indexes in miss_indexes]
+
+            def on_verdict(miss: int, judgment: dict):
+                # A verdict answers every guess that normalizes to the same key
+                for index in miss_indexes[miss]:
+                    send_partial(index, judgment)
+
+            # Settle the obvious guesses locally and only send the ambiguous ones to the AI
+            resolved = local_judge.judge(keyword, miss_guesses) if local_judge else [None] * len(miss_guesses)
+            ambiguous = [miss for miss, judgment in enumerate(resolved) if judgment is None]
+            metrics.local_judge_verdicts.inc("settled", amount=len(resolved) - len(ambiguous))
+            for miss, judgment in enumerate(resolved):
+                if judgment is not None:
+                    on_verdict(miss, judgment)
+
+            if ambiguous:
+                try:
+                    ai_judgments = await judge_batcher.judge(
+                        keyword,
+                        [miss_guesses[miss] for miss in ambiguous],
+                        deadline,
+                        lambda position, judgment: on_verdict(ambiguous[position], judgment)
+                    )
+                    for miss, judgment in zip(ambiguous, ai_judgments):
+                        judgment_cache.set(keyword, miss_guesses[miss], judgment)
+                        resolved[miss] = judgment
+                    metrics.local_judge_verdicts.inc("ambiguous", amount=len(ambiguous))
+                except Exception as e:
+                    # Before falling back to manual judgment, let the local engine settle the rest with less confidence
+                    fallback = local_judge.judge(
+                        keyword, [miss_guesses[miss] for miss in ambiguous], JUDGE_LOCAL_FALLBACK_THRESHOLD
+                    ) if local_judge else [None]
+                    if any(judgment is None for judgment in fallback):
+                        raise
+                    logger.warning(f"AI judgment failed for room {room_id}, judged locally: {str(e)}")
+                    metrics.local_judge_verdicts.inc("fallback", amount=len(ambiguous))
+                    for miss, judgment in zip(ambiguous, fallback):
+                        on_verdict(miss, judgment)
+                        resolved[miss] = judgment
+
+            # Merge fresh verdicts back in the original order
+            for indexes, judgment in zip(miss_indexes, resolved):
+                for index in indexes:
+                    judgments[index] = {**judgment, "guess": guess_list[index]}
+        logger.info(f"AI judgments for room {room_id} ({len(guess_list) - sum(map(len, misses.values()))} cached): {judgments}")
 
         # Prepare judgment data for the frontend
-        judgment_data = []
-        judgment_index = 0
-        for player_id, guess in guesses.items():
-            if player_id != client_id:  # Exclude the drawer
-                judgment = judgments[judgment_index]
-                player = next((p for p in room["players"] if p["client_id"] == player_id), None)
-                if player:
-                    judgment_data.append({
-                        "player_id": player_id,
-                        "nickname": player["nickname"],
-                        "guess": guess,
-                        "is_correct": judgment["is_correct"],
-                        "reason": judgment["reason"]
-                    })
-                judgment_index += 1
+        judgment_data = [
+            data for data in (
+                to_judgment_data(player_id, judgment)
+                for player_id, judgment in zip(player_ids, judgments)
+            ) if data
+        ]
+        await asyncio.gather(*partial_sends, return_exceptions=True)
 
         # Send AI judgment results to the frontend for confirmation
         await manager.broadcast_to_room(room_id, {
@@ -195,6 +502,7 @@ async def handle_request_ai_judgment(websocket: WebSocket, client_id: str, data:
     except Exception as e:
         error_message = str(e)
         logger.error(f"Error in AI judgment: {error_message}")
+        await asyncio.gather(*partial_sends, return_exceptions=True)
         
         # Broadcast AI judgment failure message, switch to manual judgment mode
         await manager.broadcast_to_room(room_id, {
@@ -204,7 +512,7 @@ async def handle_request_ai_judgment(websocket: WebSocket, client_id: str, data:
                 {
                     "player_id": player_id,
                     "guess": guess,
-                    "nickname": next((p["nickname"] for p in room["players"] if p["client_id"] == player_id), None)
+                    "nickname": getattr(room.get_player(player_id), "nickname", None)
                 }
                 for player_id, guess in guesses.items()
                 if player_id != client_id
@@ -225,7 +533,7 @@ async def handle_submit_judgments(websocket: WebSocket, client_id: str, data: di
     logger.info(f"Final judgments submitted for room {room_id}: {judgments}")
 
     # Find the current drawer
-    current_drawer = next((p for p in room["players"] if p["isDrawing"]), None)
+    current_drawer = room.drawer
 
     # Count correct guesses
     correct_guesses_count = sum(1 for j in judgments if j["is_correct"])
@@ -234,78 +542,68 @@ async def handle_submit_judgments(websocket: WebSocket, client_id: str, data: di
     # 1. Increase the drawer's drawings_guessed_correctly count
     # 2. Increase the drawer's score (1 point for each correct guess)
     if current_drawer and correct_guesses_count > 0:
-        current_drawer["drawings_guessed_correctly"] = current_drawer.get("drawings_guessed_correctly", 0) + 1
-        current_drawer["score"] = current_drawer.get("score", 0) + correct_guesses_count
-        logger.info(f"Drawer {current_drawer['nickname']} earned {correct_guesses_count} points for {correct_guesses_count} correct guesses")
+        current_drawer.drawings_guessed_correctly += 1
+        current_drawer.score += correct_guesses_count
+        logger.info(f"Drawer {current_drawer.nickname} earned {correct_guesses_count} points for {correct_guesses_count} correct guesses")
 
     # Update guessers' scores
     for judgment in judgments:
-        player_id = judgment["player_id"]
-        is_correct = judgment["is_correct"]
-        player = next((p for p in room["players"] if p["client_id"] == player_id), None)
-        if player and is_correct:
-            player["score"] = player.get("score", 0) + 1
-            player["correct_guesses"] = player.get("correct_guesses", 0) + 1
+        player = room.get_player(judgment["player_id"])
+        if player and judgment["is_correct"]:
+            player.score += 1
+            player.correct_guesses += 1
 
     # Update room status
-    room["status"] = "round_end"
-    room["judgments_submitted"] = True
+    room.status = "round_end"
+    room.judgments_submitted = True
     
     # Reset all players' ready status
-    for player in room["players"]:
-        player["ready"] = False
+    for player in room.players.values():
+        player.ready = False
 
     # Select the next drawer
-    current_drawer_index = next((i for i, p in enumerate(room["players"]) if p["isDrawing"]), 0)
-    room["players"][current_drawer_index]["isDrawing"] = False
-    next_drawer_index = (current_drawer_index + 1) % len(room["players"])
-    room["players"][next_drawer_index]["isDrawing"] = True
+    room.rotate_drawer()
+
+    round_judgments = [
+        {
+            "player_id": judgment["player_id"],
+            "guess": room.guesses.get(judgment["player_id"], ""),
+            "is_correct": judgment["is_correct"]
+        }
+        for judgment in judgments
+    ]
 
     # Check if it's the last round
-    if room["currentRound"] >= room["totalRounds"]:
+    if room.current_round >= room.total_rounds:
         # Game over
-        room["status"] = "game_over"
+        room.status = "game_over"
         await manager.broadcast_to_room(room_id, {
             "event": "game_over",
-            "players": room["players"],
+            "players": room.players_payload(),
             "final_scores": [
                 {
-                    "nickname": player["nickname"],
-                    "score": player.get("score", 0),
-                    "correct_guesses": player.get("correct_guesses", 0),
-                    "drawings_guessed_correctly": player.get("drawings_guessed_correctly", 0)
-                }
-                for player in room["players"]
-            ],
-            "judgments": [
-                {
-                    "player_id": judgment["player_id"],
-                    "guess": room["guesses"].get(judgment["player_id"], ""),
-                    "is_correct": judgment["is_correct"]
+                    "nickname": player.nickname,
+                    "score": player.score,
+                    "correct_guesses": player.correct_guesses,
+                    "drawings_guessed_correctly": player.drawings_guessed_correctly
                 }
-                for judgment in judgments
+                for player in room.players.values()
             ],
-            "keyword": room["currentKeyword"]
+            "judgments": round_judgments,
+            "keyword": room.current_keyword
         })
         logger.info(f"Game over in room {room_id}")
     else:
         # Broadcast round end and final results
         await manager.broadcast_to_room(room_id, {
             "event": "round_end",
-            "judgments": [
-                {
-                    "player_id": judgment["player_id"],
-                    "guess": room["guesses"].get(judgment["player_id"], ""),
-                    "is_correct": judgment["is_correct"]
-                }
-                for judgment in judgments
-            ],
-            "players": room["players"],
-            "keyword": room["currentKeyword"],
-            "current_round": room["currentRound"],
-            "total_rounds": room["totalRounds"]
+            "judgments": round_judgments,
+            "players": room.players_payload(),
+            "keyword": room.current_keyword,
+            "current_round": room.current_round,
+            "total_rounds": room.total_rounds
         })
-        logger.info(f"Round {room['currentRound']} ended in room {room_id}")
+        logger.info(f"Round {room.current_round} ended in room {room_id}")
 
 async def handle_player_ready(websocket: WebSocket, client_id: str, data: dict):
     """
@@ -316,46 +614,39 @@ async def handle_player_ready(websocket: WebSocket, client_id: str, data: dict):
         return
     
     room = rooms[room_id]
-    player = next((p for p in room["players"] if p["client_id"] == client_id), None)
+    # Only the first ready after a round ended starts the next one, repeats would skip rounds
+    if room.status != "round_end":
+        metrics.events_coalesced.inc("player_ready")
+        return
+    player = room.get_player(client_id)
     if player:
-        player["ready"] = True
+        player.ready = True
         
         # Broadcast player ready status update
-        room["status"] = "round_start"
+        room.status = "round_start"
         await manager.broadcast_to_room(room_id, {
             "event": "round_start",
-            "players": room["players"]
+            "players": room.players_payload()
         })
         
         # Check if the current player is ready
-        if player["ready"]:
+        if player.ready:
             # Update round number
-            room["currentRound"] += 1
-            room["guesses"] = {}
-            room["currentDrawing"] = None
-            room["currentKeyword"] = None
+            room.current_round += 1
+            room.reset_round()
             
-            # Clean up drawing-related states
-            try:
-                # Get the current room's image file path
-                ROOT_DIR = Path(__file__).resolve().parent.parent
-                IMAGES_DIR = ROOT_DIR / "public" / "images"
-                for file in IMAGES_DIR.glob(f"{room_id}_*"):
-                    try:
-                        os.remove(file)
-                        logger.info(f"Removed drawing file: {file}")
-                    except Exception as e:
-                        logger.error(f"Error removing file {file}: {e}")
-            except Exception as e:
-                logger.error(f"Error cleaning up drawings: {e}")
-
-            logger.info(f"Starting round {room['currentRound']} in room {room_id}")
+            # Clean up drawing-related states, files are removed in the background
+            drawing_store.discard(room_id)
+            stroke_store.discard(room_id)
+            drawing_janitor.schedule(room_id)
+
+            logger.info(f"Starting round {room.current_round} in room {room_id}")
             # Broadcast new round start
             await manager.broadcast_to_room(room_id, {
                 "event": "round_start",
-                "currentRound": room["currentRound"],
-                "totalRounds": room["totalRounds"],
-                "players": room["players"]
+                "currentRound": room.current_round,
+                "totalRounds": room.total_rounds,
+                "players": room.players_payload()
             })
             
 async def handle_disconnect(client_id: str):
@@ -363,42 +654,61 @@ async def handle_disconnect(client_id: str):
     Handle player disconnection
     """
     manager.disconnect(client_id)
+    rate_limiter.forget_client(client_id)
     if client_id in socket_to_room:
         room_id = socket_to_room[client_id]
-        if room_id in rooms:
-            # Remove player from the room
-            was_drawing = False
-            for player in rooms[room_id]["players"]:
-                if player["client_id"] == client_id:
-                    was_drawing = player["isDrawing"]
-                    break
-            
-            rooms[room_id]["players"] = [
-                p for p in rooms[room_id]["players"] 
-                if p["client_id"] != client_id
-            ]
-            
-            # If the room is empty, delete it
-            if not rooms[room_id]["players"]:
-                del rooms[room_id]
-                logger.info(f"Room {room_id} deleted (no players)")
-            else:
-                # If the player who left was the drawer, select a new drawer
-                if was_drawing:
-                    rooms[room_id]["players"][0]["isDrawing"] = True
-                await manager.broadcast_to_room(room_id, {
-                    "event": "player_left",
-                    "players": rooms[room_id]["players"],
-                    "drawer_left": was_drawing
-                })
-                logger.info(f"Player left room {room_id}, drawer_left: {was_drawing}")
+        async with rooms.lock(room_id):
+            if room_id in rooms:
+                room = rooms[room_id]
+                # Remove player from the room
+                player = room.remove_player(client_id)
+                was_drawing = player is not None and player.is_drawing
+                
+                # If the room is empty, delete it
+                if not room.players:
+                    del rooms[room_id]
+                    rate_limiter.forget_room(room_id)
+                    drawing_store.discard(room_id)
+                    stroke_store.discard(room_id)
+                    drawing_janitor.schedule(room_id)
+                    logger.info(f"Room {room_id} deleted (no players)")
+                else:
+                    # If the player who left was the drawer, select a new drawer
+                    if was_drawing:
+                        room.set_drawer(next(iter(room.players.values())))
+                    await manager.broadcast_to_room(room_id, {
+                        "event": "player_left",
+                        "players": room.players_payload(),
+                        "drawer_left": was_drawing
+                    })
+                    logger.info(f"Player left room {room_id}, drawer_left: {was_drawing}")
         del socket_to_room[client_id]
 
+async def handle_request_snapshot(websocket: WebSocket, client_id: str, data: dict):
+    """
+    Handle a client that detected a gap in the player patches and needs the full state
+    """
+    room_id = data["roomId"]
+    if room_id not in rooms:
+        manager.send(client_id, {"event": "error", "message": "Room not found"})
+        return
+
+    manager.send(client_id, {
+        "event": "room_snapshot",
+        **rooms[room_id].snapshot()
+    })
+
 event_handlers = {
     "create_room": handle_create_room,
     "join_room": handle_join_room,
     "submit_drawing": handle_submit_drawing,
     "request_ai_judgment": handle_request_ai_judgment,
     "player_ready": handle_player_ready,
-    "submit_judgments": handle_submit_judgments
-} 
\ No newline at end of file
+    "submit_judgments": handle_submit_judgments,
+    "request_snapshot": handle_request_snapshot,
+    "draw_strokes": handle_draw_strokes,
+    "request_strokes": handle_request_strokes
+}
+
+# Events that modify their room, handled while holding the room's lock
+room_mutating_events = {"join_room", "submit_drawing", "submit_judgments", "player_ready"} 
\ No newline at end of file
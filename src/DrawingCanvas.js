@@ -1,10 +1,18 @@
-import React, { useRef, useState, useEffect } from 'react';
+import React, { useRef, useState, useEffect, useCallback } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import { connectWebSocket, sendMessage, addMessageHandler, removeMessageHandler, api } from './utils/websocket';
 import './style.css';
 
+// How often batched stroke segments are streamed to the room (ms)
+const STROKE_FLUSH_INTERVAL = 50;
+
 const DrawingCanvas = () => {
     const canvasRef = useRef(null);
+    // Stroke streaming: the segment being drawn and the segments waiting for the next flush
+    const strokeIdRef = useRef(0);
+    const currentSegmentRef = useRef(null);
+    const pendingSegmentsRef = useRef([]);
+    const hasStreamedRef = useRef(false);
     const [isDrawing, setIsDrawing] = useState(false);
     const [color, setColor] = useState('#000000');
     const [isErasing, setIsErasing] = useState(false);
@@ -90,6 +98,29 @@ const DrawingCanvas = () => {
         };
     }, [roomId, nickname, clientId, navigate]);
 
+    const flushStrokes = useCallback(() => {
+        const segment = currentSegmentRef.current;
+        if (segment && segment.p.length > 2) {
+            pendingSegmentsRef.current.push(segment);
+            // Continue the stroke from its last point in the next batch
+            currentSegmentRef.current = { ...segment, p: segment.p.slice(-2) };
+        }
+        if (pendingSegmentsRef.current.length === 0) return;
+        sendMessage({
+            event: 'draw_strokes',
+            roomId,
+            clientId,
+            strokes: pendingSegmentsRef.current
+        });
+        pendingSegmentsRef.current = [];
+        hasStreamedRef.current = true;
+    }, [roomId, clientId]);
+
+    useEffect(() => {
+        const timer = setInterval(flushStrokes, STROKE_FLUSH_INTERVAL);
+        return () => clearInterval(timer);
+    }, [flushStrokes]);
+
     const getMousePos = (canvas, evt) => {
         const rect = canvas.getBoundingClientRect();
         return {
@@ -105,6 +136,13 @@ const DrawingCanvas = () => {
         ctx.beginPath();
         ctx.moveTo(pos.x, pos.y);
         setIsDrawing(true);
+        strokeIdRef.current += 1;
+        currentSegmentRef.current = {
+            i: strokeIdRef.current,
+            c: isErasing ? null : color,
+            w: isErasing ? brushSize * 5 : brushSize,
+            p: [Math.round(pos.x), Math.round(pos.y)]
+        };
     };
 
     const handleMouseMove = (e) => {
@@ -122,10 +160,18 @@ const DrawingCanvas = () => {
         }
         ctx.lineTo(pos.x, pos.y);
         ctx.stroke();
+        if (currentSegmentRef.current) {
+            currentSegmentRef.current.p.push(Math.round(pos.x), Math.round(pos.y));
+        }
     };
 
     const handleMouseUp = () => {
         setIsDrawing(false);
+        const segment = currentSegmentRef.current;
+        if (segment && segment.p.length > 2) {
+            pendingSegmentsRef.current.push(segment);
+        }
+        currentSegmentRef.current = null;
     };
 
     const handleClear = () => {
@@ -133,6 +179,7 @@ const DrawingCanvas = () => {
         const ctx = canvas.getContext('2d');
         ctx.fillStyle = 'white';
         ctx.fillRect(0, 0, canvas.width, canvas.height);
+        pendingSegmentsRef.current.push({ clear: true });
     };
 
     const handleConfirm = async () => {
@@ -142,26 +189,38 @@ const DrawingCanvas = () => {
         }
 
         try {
-            const canvas = canvasRef.current;
-            // Convert the canvas to a Blob
-            const blob = await new Promise(resolve => {
-                canvas.toBlob(resolve, 'image/png');
-            });
+            flushStrokes();
+            if (hasStreamedRef.current) {
+                // The room already has the strokes, the server renders the image
+                sendMessage({
+                    event: 'submit_drawing',
+                    roomId,
+                    clientId,
+                    strokes: true,
+                    keyword: keyword.trim()
+                });
+            } else {
+                const canvas = canvasRef.current;
+                // Convert the canvas to a Blob
+                const blob = await new Promise(resolve => {
+                    canvas.toBlob(resolve, 'image/png');
+                });
 
-            // Upload the drawing
-            const uploadResult = await api.uploadDrawing(roomId, clientId, blob);
-            if (uploadResult.status !== 'success') {
-                throw new Error('Failed to upload drawing');
-            }
+                // Upload the drawing
+                const uploadResult = await api.uploadDrawing(roomId, clientId, blob);
+                if (uploadResult.status !== 'success') {
+                    throw new Error('Failed to upload drawing');
+                }
 
-            // Send the drawing and keyword to WebSocket
-            sendMessage({
-                event: 'submit_drawing',
-                roomId,
-                clientId,
-                drawingUrl: uploadResult.url,
-                keyword: keyword.trim()
-            });
+                // Send the drawing and keyword to WebSocket
+                sendMessage({
+                    event: 'submit_drawing',
+                    roomId,
+                    clientId,
+                    drawingUrl: uploadResult.url,
+                    keyword: keyword.trim()
+                });
+            }
 
             // Navigate to the judge page
             navigate(`/judge/${roomId}`, {
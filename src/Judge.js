@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
-import { connectWebSocket, sendMessage, addMessageHandler, removeMessageHandler, api } from './utils/websocket';
+import { connectWebSocket, sendMessage, addMessageHandler, removeMessageHandler, api, pickDrawingUrl } from './utils/websocket';
 
 const Judge = () => {
     const location = useLocation();
@@ -45,7 +45,7 @@ const Judge = () => {
                 // Get the drawing image
                 const drawingData = await api.getDrawing(roomId);
                 if (drawingData.status === 'success') {
-                    setImageUrl(`/images/${drawingData.filename}`);
+                    setImageUrl(pickDrawingUrl(drawingData.url, drawingData.variants));
                 }
             } catch (error) {
                 console.error('Failed to fetch game state:', error);
@@ -55,6 +55,10 @@ const Judge = () => {
 
         // Event handlers
         const handlers = {
+            'new_drawing': (data) => {
+                // Stroke-stream drawings are rendered by the server after the drawer submits
+                setImageUrl(pickDrawingUrl(data.drawingUrl, data.variants));
+            },
             'all_guessed': (data) => {
                 setIsWaitingAI(true);
                 setGuesses(data.guesses);
@@ -80,6 +84,19 @@ const Judge = () => {
                 });
                 setManualJudgments(initialJudgments);
             },
+            'ai_judgment_partial': (data) => {
+                // show each AI verdict as soon as it arrives
+                const judgment = data.judgment;
+                setAiJudgments(prev => [
+                    ...(prev || []).filter(j => j.player_id !== judgment.player_id),
+                    judgment
+                ]);
+                setShowManualJudge(true);
+                setManualJudgments(prev => ({
+                    ...prev,
+                    [judgment.player_id]: judgment.is_correct
+                }));
+            },
             'ai_judgment_failed': (data) => {
                 setIsWaitingAI(false);
                 setAiError(data.error);
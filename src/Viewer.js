@@ -1,6 +1,6 @@
 import React, { useRef, useLayoutEffect, useCallback, useState, useReducer, useEffect } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
-import { connectWebSocket, sendMessage, addMessageHandler, removeMessageHandler, api } from './utils/websocket';
+import { connectWebSocket, sendMessage, addMessageHandler, removeMessageHandler, api, pickDrawingUrl } from './utils/websocket';
 
 const Viewer = () => {
     const location = useLocation();
@@ -28,6 +28,49 @@ const Viewer = () => {
     const [roundResults, setRoundResults] = useState(null);
     const [showScoreBoard, setShowScoreBoard] = useState(false);
     const [keyword, setKeyword] = useState('');
+    // Live stroke stream from the drawer
+    const strokeCanvasRef = useRef(null);
+    const strokeSeqRef = useRef(0);
+    const replayPendingRef = useRef(false);
+    const [hasStrokes, setHasStrokes] = useState(false);
+
+    const drawSegments = useCallback((segments) => {
+        const canvas = strokeCanvasRef.current;
+        if (!canvas) return;
+        const ctx = canvas.getContext('2d');
+        ctx.lineCap = 'round';
+        ctx.lineJoin = 'round';
+        segments.forEach(segment => {
+            if (segment.clear) {
+                ctx.fillStyle = 'white';
+                ctx.fillRect(0, 0, canvas.width, canvas.height);
+                return;
+            }
+            // Eraser segments have no color and paint the background
+            ctx.strokeStyle = segment.c || 'white';
+            ctx.lineWidth = segment.w;
+            ctx.beginPath();
+            ctx.moveTo(segment.p[0], segment.p[1]);
+            for (let i = 2; i < segment.p.length; i += 2) {
+                ctx.lineTo(segment.p[i], segment.p[i + 1]);
+            }
+            ctx.stroke();
+        });
+        if (segments.length > 0) {
+            setHasStrokes(true);
+        }
+    }, []);
+
+    const resetStrokes = useCallback(() => {
+        const canvas = strokeCanvasRef.current;
+        if (canvas) {
+            const ctx = canvas.getContext('2d');
+            ctx.fillStyle = 'white';
+            ctx.fillRect(0, 0, canvas.width, canvas.height);
+        }
+        strokeSeqRef.current = 0;
+        setHasStrokes(false);
+    }, []);
 
     const handlePersonalJudgment = useCallback((data) => {
         judgmentResultRef.current = {
@@ -61,7 +104,7 @@ const Viewer = () => {
                 if (state.status != 'round_start') {
                     const drawingData = await api.getDrawing(roomId);
                     if (drawingData.status === 'success') {
-                        setCurrentDrawing(drawingData.url);
+                        setCurrentDrawing(pickDrawingUrl(drawingData.url, drawingData.variants));
                     }
                 }
             } catch (error) {
@@ -69,6 +112,10 @@ const Viewer = () => {
             }
         };
         fetchGameState();
+        // Replay the strokes drawn before we arrived
+        resetStrokes();
+        replayPendingRef.current = true;
+        sendMessage({ event: 'request_strokes', roomId, clientId, since: 0 });
 
         const handlers = {
             'player_joined': (data) => {
@@ -81,8 +128,28 @@ const Viewer = () => {
                     setTimeout(() => navigate('/'), 3000);
                 }
             },
+            'strokes': (data) => {
+                if (data.seq <= strokeSeqRef.current) return;
+                if (data.seq !== strokeSeqRef.current + 1) {
+                    // Missed a batch: ask for everything after the last one we drew
+                    if (!replayPendingRef.current) {
+                        replayPendingRef.current = true;
+                        sendMessage({ event: 'request_strokes', roomId, clientId, since: strokeSeqRef.current });
+                    }
+                    return;
+                }
+                strokeSeqRef.current = data.seq;
+                drawSegments(data.strokes);
+            },
+            'stroke_replay': (data) => {
+                replayPendingRef.current = false;
+                if (data.seq > strokeSeqRef.current) {
+                    strokeSeqRef.current = data.seq;
+                    drawSegments(data.strokes);
+                }
+            },
             'new_drawing': (data) => {
-                setCurrentDrawing(data.drawingUrl);
+                setCurrentDrawing(pickDrawingUrl(data.drawingUrl, data.variants));
                 setHasGuessed(false);
                 setGuess('');
                 setShowScoreBoard(false);
@@ -100,6 +167,7 @@ const Viewer = () => {
                 }
                 // Clear current drawing and score display
                 setCurrentDrawing(null);
+                resetStrokes();
                 setShowScoreBoard(false);
                 setHasGuessed(false);
                 setGuess('');
@@ -155,7 +223,7 @@ const Viewer = () => {
                 removeMessageHandler(event);
             });
         };
-    }, [roomId, nickname, clientId, totalRounds, handlePersonalJudgment, navigate]);
+    }, [roomId, nickname, clientId, totalRounds, handlePersonalJudgment, navigate, drawSegments, resetStrokes]);
 
     const handleGuess = useCallback(async (e) => {
         e.preventDefault();
@@ -196,8 +264,14 @@ const Viewer = () => {
             </div>
             <div className="viewer-header">
                 <div className="viewer-main">
+                    <canvas
+                        ref={strokeCanvasRef}
+                        width={700}
+                        height={700}
+                        style={{ maxWidth: '100%', display: hasStrokes && !showScoreBoard ? 'block' : 'none' }}
+                    ></canvas>
                     {!currentDrawing && !showScoreBoard ? (
-                        <p>Waiting for the drawer to upload an image...</p>
+                        hasStrokes ? null : <p>Waiting for the drawer to upload an image...</p>
                     ) : showScoreBoard && roundResults ? (
                         <div className="round-end">
                             <h3>Round Result</h3>
@@ -272,7 +346,8 @@ const Viewer = () => {
                         </div>
                     ) : (
                         <>
-                            <img src={currentDrawing} alt="Drawing" style={{ maxWidth: '100%' }} />
+                            {/* Drawings streamed as strokes are already on the canvas */}
+                            {!hasStrokes && <img src={currentDrawing} alt="Drawing" style={{ maxWidth: '100%' }} />}
                             {!hasGuessed ? (
                                 <form onSubmit={handleGuess}>
                                     <input
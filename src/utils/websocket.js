@@ -9,6 +9,10 @@ let reconnectAttempts = 0;
 const MAX_RECONNECT_ATTEMPTS = 5;
 const RECONNECT_DELAY = 3000;
 
+// Versioned player lists per room, rebuilt from the server's patches
+let roomStates = new Map();
+let pendingPatches = new Map();
+
 const BASE_URL = process.env.REACT_APP_SERVER_BASE_URL?.replace(/^https?:\/\//, '') || 'localhost:8000';
 const API_BASE_URL = process.env.REACT_APP_SERVER_BASE_URL + '/api' || 'http://localhost:8000/api';
 
@@ -33,7 +37,7 @@ export const connectWebSocket = (clientId) => {
     currentClientId = clientId;
 
     // Use FastAPI's WebSocket endpoint
-    ws = new WebSocket(`ws://${BASE_URL}/ws/${clientId}`);
+    ws = new WebSocket(`ws://${BASE_URL}/ws/${clientId}?deltas=1`);
 
     ws.onopen = () => {
         console.log('WebSocket connected');
@@ -45,9 +49,12 @@ export const connectWebSocket = (clientId) => {
         try {
             const data = JSON.parse(event.data);
             console.log('Received message:', data);
-            const handler = messageHandlers.get(data.event);
-            if (handler) {
-                handler(data);
+            if (data.event === 'room_snapshot') {
+                applySnapshot(data);
+            } else if (data.players_patch) {
+                applyPatchedMessage(data);
+            } else {
+                dispatchMessage(data);
             }
         } catch (error) {
             console.error('Error processing message:', error);
@@ -77,6 +84,57 @@ export const connectWebSocket = (clientId) => {
     return ws;
 };
 
+const dispatchMessage = (data) => {
+    const handler = messageHandlers.get(data.event);
+    if (handler) {
+        handler(data);
+    }
+};
+
+// Apply a player patch and hand the message on with the full player list
+const applyPatchedMessage = (data) => {
+    const patch = data.players_patch;
+    const state = roomStates.get(patch.roomId);
+    if (!state || state.version !== patch.from) {
+        // We missed an update: keep the message and ask for the full state
+        const pending = pendingPatches.get(patch.roomId);
+        if (pending) {
+            pending.push(data);
+            return;
+        }
+        pendingPatches.set(patch.roomId, [data]);
+        sendMessage({ event: 'request_snapshot', roomId: patch.roomId });
+        return;
+    }
+
+    const players = new Map(state.players.map(p => [p.client_id, p]));
+    (patch.removed || []).forEach(clientId => players.delete(clientId));
+    Object.entries(patch.changed).forEach(([clientId, fields]) => {
+        players.set(clientId, { ...players.get(clientId), ...fields });
+    });
+    const order = patch.order || state.players.map(p => p.client_id);
+    state.players = order.map(clientId => players.get(clientId)).filter(Boolean);
+    state.version = patch.to;
+
+    const { players_patch, ...message } = data;
+    dispatchMessage({ ...message, players: state.players, version: state.version });
+};
+
+const applySnapshot = (data) => {
+    roomStates.set(data.roomId, { version: data.version, players: data.players });
+    const pending = pendingPatches.get(data.roomId) || [];
+    pendingPatches.delete(data.roomId);
+    pending.forEach(message => {
+        if (message.players_patch.to <= data.version) {
+            // Already included in the snapshot
+            const { players_patch, ...rest } = message;
+            dispatchMessage({ ...rest, players: data.players, version: data.version });
+        } else {
+            applyPatchedMessage(message);
+        }
+    });
+};
+
 export const addMessageHandler = (event, handler) => {
     messageHandlers.set(event, handler);
 };
@@ -113,6 +171,17 @@ const handleResponse = async (response) => {
     return response.json();
 };
 
+// Pick the smallest drawing variant that still fills the viewport
+export const pickDrawingUrl = (url, variants) => {
+    if (!variants || variants.length === 0) return url;
+    const needed = Math.min(window.innerWidth, 700) * (window.devicePixelRatio || 1);
+    const sorted = [...variants].sort((a, b) => (a.width - b.width) || (a.bytes - b.bytes));
+    const fit = sorted.find(variant => variant.width >= needed);
+    if (fit) return fit.url;
+    const largest = sorted[sorted.length - 1].width;
+    return sorted.find(variant => variant.width === largest).url;
+};
+
 export const api = {
     // Game state
     getGameState: async (roomId) => {